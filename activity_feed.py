@@ -0,0 +1,160 @@
+import asyncio
+import datetime
+import json
+import queue
+import threading
+import time
+
+from flask import current_app
+
+# Events are plain dicts:
+#   {"result_id", "student_id", "quiz_id", "score", "violation_count", "submitted_at"}
+# A non-zero violation_count is a proctoring flag.
+RESULT_FIELDS = ("student_id", "quiz_id", "score", "violation_count", "submitted_at")
+REALTIME_RETRY_SECONDS = 10
+
+_listener_lock = threading.Lock()
+
+
+class Broker:
+    """In-process fan-out: every subscriber gets its own bounded queue.
+
+    A subscriber that stops reading misses events rather than holding up the
+    publisher or the other subscribers. Each subscriber is a stream holding a
+    worker thread, so at most ``max_subscribers`` are let in at once.
+    """
+
+    def __init__(self, max_pending=100, max_subscribers=2):
+        self.max_pending = max_pending
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        """A new subscriber queue, or None if the broker is full."""
+        q = queue.Queue(maxsize=self.max_pending)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(event)
+            except queue.Full:
+                pass
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+
+class RealtimeListener(threading.Thread):
+    """One Supabase Realtime subscription per worker, republished to the broker.
+
+    Sees exam_results inserts from every worker (and the drainer), which the
+    local source can't. The realtime client is asyncio-only, so it gets a
+    loop of its own on this thread.
+    """
+
+    def __init__(self, url, key, broker):
+        super().__init__(name="activity-realtime", daemon=True)
+        self.url = url
+        self.key = key
+        self.broker = broker
+
+    def run(self):
+        while True:
+            try:
+                asyncio.run(self._listen())
+            except Exception as e:
+                print(f"Activity feed realtime error: {str(e)}")
+            time.sleep(REALTIME_RETRY_SECONDS)
+
+    async def _listen(self):
+        from realtime import AsyncRealtimeClient
+
+        client = AsyncRealtimeClient(f"{self.url.rstrip('/')}/realtime/v1", self.key)
+        await client.connect()
+        channel = client.channel("exam-results")
+        channel.on_postgres_changes("INSERT", self._on_insert, table="exam_results", schema="public")
+        await channel.subscribe()
+        # The client's own tasks do the listening; this only ends if they do
+        while client.is_connected:
+            await asyncio.sleep(REALTIME_RETRY_SECONDS)
+
+    def _on_insert(self, payload):
+        record = payload["data"].get("record") or {}
+        self.broker.publish(make_event(record.get("id"), record))
+
+
+def make_event(result_id, row):
+    event = {field: row.get(field) for field in RESULT_FIELDS}
+    event["result_id"] = result_id
+    event["violation_count"] = event["violation_count"] or 0
+    if not event["submitted_at"] or event["submitted_at"] == "now()":
+        event["submitted_at"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    return event
+
+
+def init_app(app):
+    app.extensions["activity_broker"] = Broker(app.config["ACTIVITY_MAX_PENDING"], app.config["ACTIVITY_MAX_STREAMS"])
+
+
+def check_workers(app, workers):
+    """Refuse the local source when results can be saved by another worker."""
+    if workers > 1 and app.config["ACTIVITY_FEED_SOURCE"] == "local":
+        raise RuntimeError(
+            f'ACTIVITY_FEED_SOURCE="local" only sees results saved by the same worker, '
+            f'but gunicorn runs {workers}; use "realtime"'
+        )
+
+
+def get_broker():
+    """The worker's broker, with the realtime listener started on first use."""
+    broker = current_app.extensions["activity_broker"]
+    if current_app.config["ACTIVITY_FEED_SOURCE"] == "realtime":
+        # Started lazily so it runs in the worker, not the preloading master
+        with _listener_lock:
+            if current_app.extensions.get("activity_listener") is None:
+                listener = RealtimeListener(current_app.config["SUPABASE_URL"], current_app.config["SUPABASE_KEY"], broker)
+                listener.start()
+                current_app.extensions["activity_listener"] = listener
+    return broker
+
+
+def publish_result(result_id, row):
+    """Announce a saved result to this worker's subscribers (local source only)."""
+    if current_app.config["ACTIVITY_FEED_SOURCE"] == "local":
+        current_app.extensions["activity_broker"].publish(make_event(result_id, row))
+
+
+def stream(broker, q, describe, heartbeat, max_seconds):
+    """Server-sent events for one subscriber queue from ``broker.subscribe()``.
+
+    ``describe(event)`` adds display fields, or returns None to skip an event
+    (e.g. another instructor's quiz). The stream closes after ``max_seconds``
+    so a worker thread isn't held forever; EventSource reconnects on its own.
+    """
+    deadline = time.monotonic() + max_seconds
+    try:
+        yield "retry: 3000\n\n"
+        while time.monotonic() < deadline:
+            try:
+                event = q.get(timeout=heartbeat)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+            event = describe(event)
+            if event is not None:
+                yield f"event: submission\ndata: {json.dumps(event)}\n\n"
+    finally:
+        broker.unsubscribe(q)
@@ -0,0 +1,209 @@
+import datetime
+import json
+import os
+
+from flask import current_app
+
+import fetching
+from backend import supabase
+
+NAMESPACE = "skilltrack"
+WATERMARK_PROPERTY = "skilltrack.watermark"
+
+# Columns fetched from the backend for each incremental table
+EXAM_RESULT_COLUMNS = ("id, student_id, quiz_id, score, correct_count, total_questions, violation_count, "
+                       "passed, feedback, answers, submitted_at, quizzes(course_id)")
+XP_TRANSACTION_COLUMNS = "id, student_id, quiz_id, xp_earned, reason, created_at"
+
+
+def _schemas():
+    # pyiceberg/pyarrow are only needed by the exporter, never by web workers
+    from pyiceberg.partitioning import PartitionField, PartitionSpec
+    from pyiceberg.schema import Schema
+    from pyiceberg.transforms import MonthTransform
+    from pyiceberg.types import (
+        BooleanType, DoubleType, LongType, MapType, NestedField, StringType, TimestamptzType,
+    )
+
+    # Field ids as Iceberg assigns them on create (top-level columns first, then
+    # the map's key and value), so the declared schema matches the stored one
+    exam_results = Schema(
+        NestedField(1, "id", StringType(), required=False),
+        NestedField(2, "student_id", StringType(), required=False),
+        NestedField(3, "quiz_id", StringType(), required=False),
+        NestedField(4, "course_id", StringType(), required=False),
+        NestedField(5, "score", DoubleType(), required=False),
+        NestedField(6, "correct_count", LongType(), required=False),
+        NestedField(7, "total_questions", LongType(), required=False),
+        NestedField(8, "violation_count", LongType(), required=False),
+        NestedField(9, "passed", BooleanType(), required=False),
+        NestedField(10, "feedback", StringType(), required=False),
+        NestedField(11, "answers", MapType(13, StringType(), 14, StringType(), value_required=False), required=False),
+        NestedField(12, "submitted_at", TimestamptzType(), required=False),
+    )
+    xp_transactions = Schema(
+        NestedField(1, "student_id", StringType(), required=False),
+        NestedField(2, "quiz_id", StringType(), required=False),
+        NestedField(3, "xp_earned", LongType(), required=False),
+        NestedField(4, "reason", StringType(), required=False),
+        NestedField(5, "created_at", TimestamptzType(), required=False),
+    )
+    enrollments = Schema(
+        NestedField(1, "student_id", StringType(), required=False),
+        NestedField(2, "course_id", StringType(), required=False),
+    )
+    return {
+        "exam_results": (exam_results, PartitionSpec(
+            PartitionField(source_id=12, field_id=1000, transform=MonthTransform(), name="submitted_month"))),
+        "xp_transactions": (xp_transactions, PartitionSpec(
+            PartitionField(source_id=5, field_id=1000, transform=MonthTransform(), name="created_month"))),
+        "enrollments": (enrollments, PartitionSpec()),
+    }
+
+
+def get_catalog(warehouse_dir):
+    """Local Iceberg catalog: SQLite metadata, Parquet files under ``warehouse_dir``."""
+    from pyiceberg.catalog.sql import SqlCatalog
+
+    warehouse_dir = os.path.abspath(warehouse_dir)
+    os.makedirs(warehouse_dir, exist_ok=True)
+    catalog = SqlCatalog(
+        NAMESPACE,
+        uri=f"sqlite:///{os.path.join(warehouse_dir, 'catalog.db')}",
+        warehouse=f"file://{warehouse_dir}",
+    )
+    catalog.create_namespace_if_not_exists(NAMESPACE)
+    return catalog
+
+
+def _load_or_create(catalog, name):
+    schema, spec = _schemas()[name]
+    identifier = f"{NAMESPACE}.{name}"
+    table = catalog.create_table_if_not_exists(identifier, schema=schema, partition_spec=spec)
+    if _columns(table.schema()) != _columns(schema):
+        # A column type changed in a way Iceberg can't promote (score was a
+        # long). The tables are a copy of the backend, so start this one over;
+        # without a watermark the next export refills it from the beginning.
+        catalog.drop_table(identifier)
+        table = catalog.create_table(identifier, schema=schema, partition_spec=spec)
+    return table
+
+
+def _columns(schema):
+    # Names and types only: field ids are the catalog's to assign
+    return [(field.name, str(field.field_type)) for field in schema.fields]
+
+
+def _fetch_since(table_name, columns, ts_column, since, until):
+    """Rows with ``since < ts_column <= until``, oldest first.
+
+    Pages by keyset on ``(ts_column, id)``: timestamps aren't unique, so
+    offset pages ordered on them alone can skip or repeat rows that tie at
+    a page boundary. ``columns`` must include ``id``.
+    """
+    rows, last = [], None
+    while True:
+        query = supabase.table(table_name).select(columns).lte(ts_column, until)
+        if since:
+            query = query.gt(ts_column, since)
+        if last:
+            query = query.or_(f'{ts_column}.gt."{last[ts_column]}",'
+                              f'and({ts_column}.eq."{last[ts_column]}",id.gt."{last["id"]}")')
+        page = query.order(ts_column).order("id").limit(fetching.PAGE_SIZE).execute().data
+        if not page:
+            return rows
+        rows.extend(page)
+        last = page[-1]
+
+
+def _parse_timestamp(value):
+    return datetime.datetime.fromisoformat(value.replace('Z', '+00:00')) if value else None
+
+
+def _parse_answers(value):
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return None
+    if not isinstance(value, dict):
+        return None
+    return [(str(k), None if v is None else str(v)) for k, v in value.items()]
+
+
+def _exam_result_record(r):
+    return {
+        "id": str(r['id']),
+        "student_id": r.get('student_id'),
+        "quiz_id": str(r['quiz_id']) if r.get('quiz_id') is not None else None,
+        "course_id": str((r.get('quizzes') or {}).get('course_id') or '') or None,
+        "score": None if r.get('score') is None else float(r['score']),
+        "correct_count": r.get('correct_count'),
+        "total_questions": r.get('total_questions'),
+        "violation_count": r.get('violation_count'),
+        "passed": r.get('passed'),
+        "feedback": r.get('feedback'),
+        "answers": _parse_answers(r.get('answers')),
+        "submitted_at": _parse_timestamp(r.get('submitted_at')),
+    }
+
+
+def _xp_transaction_record(r):
+    return {
+        "student_id": r.get('student_id'),
+        "quiz_id": str(r['quiz_id']) if r.get('quiz_id') is not None else None,
+        "xp_earned": r.get('xp_earned'),
+        "reason": r.get('reason'),
+        "created_at": _parse_timestamp(r.get('created_at')),
+    }
+
+
+def _append_incremental(table, records, watermark):
+    """Append rows and move the watermark in one Iceberg commit."""
+    import pyarrow as pa
+
+    with table.transaction() as tx:
+        tx.append(pa.Table.from_pylist(records, schema=table.schema().as_arrow()))
+        tx.set_properties({WATERMARK_PROPERTY: watermark})
+
+
+def export_incremental(catalog, name, columns, ts_column, to_record, until):
+    """Copy rows newer than the table's watermark (and no newer than ``until``)."""
+    table = _load_or_create(catalog, name)
+    since = table.properties.get(WATERMARK_PROPERTY)
+    rows = _fetch_since(name, columns, ts_column, since, until)
+    if rows:
+        # Rows are ordered, so the last one is the new high-water mark
+        _append_incremental(table, [to_record(r) for r in rows], rows[-1][ts_column])
+    return len(rows)
+
+
+def export_enrollments(catalog):
+    """Enrollments are small and rows get deleted, so each run replaces the snapshot."""
+    import pyarrow as pa
+
+    table = _load_or_create(catalog, "enrollments")
+    rows = fetching.fetch_all(lambda: supabase.table("enrollments").select("student_id, course_id")
+                              .order("course_id").order("student_id"))
+
+    records = [{"student_id": r['student_id'], "course_id": str(r['course_id'])} for r in rows]
+    table.overwrite(pa.Table.from_pylist(records, schema=table.schema().as_arrow()))
+    return len(records)
+
+
+def export_all(warehouse_dir=None):
+    """Append new exam results and XP transactions, refresh enrollments. Returns row counts."""
+    warehouse_dir = warehouse_dir or current_app.config["ANALYTICS_WAREHOUSE_DIR"]
+    lag = datetime.timedelta(seconds=current_app.config["ANALYTICS_EXPORT_LAG_SECONDS"])
+    # Leave recent rows for the next run: buffered submissions can land a little
+    # after their submitted_at, and must not slip in behind the watermark
+    until = (datetime.datetime.now(datetime.timezone.utc) - lag).isoformat()
+
+    catalog = get_catalog(warehouse_dir)
+    return {
+        "exam_results": export_incremental(catalog, "exam_results", EXAM_RESULT_COLUMNS, "submitted_at",
+                                           _exam_result_record, until),
+        "xp_transactions": export_incremental(catalog, "xp_transactions", XP_TRANSACTION_COLUMNS, "created_at",
+                                              _xp_transaction_record, until),
+        "enrollments": export_enrollments(catalog),
+    }
@@ -0,0 +1,414 @@
+import base64
+import binascii
+import functools
+import hashlib
+import json
+import uuid
+
+import httpx
+from flask import Blueprint, current_app, request, session
+
+import transport
+from backend import supabase
+from services import attempts, gradebook, grades, grading, roster, submissions, xp
+
+# JSON for the SPA and mobile clients. The session cookie is the credential,
+# as for the HTML pages. Every response is an envelope:
+#   {"data": ...}                          one object or a full list
+#   {"data": [...], "next_cursor": "..."}  a page; pass it back as ?cursor=
+#   {"error": "..."}                       with a 4xx/5xx status
+# GETs carry an ETag; send it back as If-None-Match to get a bodiless 304.
+bp = Blueprint("api", __name__, url_prefix="/api/v1")
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+@bp.errorhandler(ApiError)
+def api_error(e):
+    return {"error": e.message}, e.status
+
+
+@bp.errorhandler(transport.BackendUnavailable)
+@bp.errorhandler(httpx.TimeoutException)
+def api_backend_unavailable(e):
+    retry_after = getattr(e, "retry_after", 0) or 5
+    return {"error": "Database unavailable, try again shortly."}, 503, {"Retry-After": str(retry_after)}
+
+
+def login_required(role=None):
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapped(*args, **kwargs):
+            if 'user_id' not in session:
+                raise ApiError("Not signed in.", 401)
+            if role and session.get('role') != role:
+                raise ApiError("Not available for this account.", 403)
+            return view(*args, **kwargs)
+        return wrapped
+    return decorator
+
+
+# ==========================================
+# FIELD SELECTION (?fields=id,title,quiz.title)
+# ==========================================
+
+def parse_fields(value):
+    """``"id,quiz.title"`` -> ``{"id": None, "quiz": {"title": None}}``; None means the whole value."""
+    tree = {}
+    for path in value.split(","):
+        parts = [p for p in path.strip().split(".") if p]
+        node = tree
+        for i, part in enumerate(parts):
+            if i == len(parts) - 1:
+                node[part] = None
+            elif part in node and node[part] is None:
+                break  # the whole parent is already selected
+            else:
+                node = node.setdefault(part, {})
+    return tree
+
+
+def select_fields(value, tree):
+    """Keep only the selected keys of a dict, or of each dict in a list."""
+    if isinstance(value, list):
+        return [select_fields(item, tree) for item in value]
+    if not isinstance(value, dict):
+        return value
+    return {key: value[key] if sub is None else select_fields(value[key], sub)
+            for key, sub in tree.items() if key in value}
+
+
+# ==========================================
+# CURSOR PAGINATION (keyset on sort column + id)
+# ==========================================
+
+def encode_cursor(row, sort_column):
+    raw = json.dumps([row[sort_column], row['id']], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor):
+    try:
+        value, last_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        # Both go into the filter string: the id must be a real uuid, the value is quoted
+        last_id = str(uuid.UUID(last_id))
+    except (ValueError, TypeError, AttributeError, binascii.Error):
+        raise ApiError("Invalid cursor.")
+    if not isinstance(value, (str, int)) or isinstance(value, bool):
+        raise ApiError("Invalid cursor.")
+    return value, last_id
+
+
+def quote(value):
+    """A PostgREST filter value, double-quoted so commas and parentheses stay literal."""
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def page_limit():
+    try:
+        limit = int(request.args.get('limit', current_app.config["API_PAGE_SIZE"]))
+    except ValueError:
+        raise ApiError("limit must be a number.")
+    return min(max(limit, 1), current_app.config["API_MAX_PAGE_SIZE"])
+
+
+def paginate(query, sort_column, desc=True):
+    """One page of ``query``, newest (or lowest) first, and the cursor for the next.
+
+    Seeks past the last row seen instead of using an offset, so deep pages
+    cost the same as the first and rows inserted meanwhile don't shift the
+    page boundary. ``query`` must select ``id`` and ``sort_column``.
+    """
+    limit = page_limit()
+    cursor = request.args.get('cursor')
+    if cursor:
+        value, last_id = decode_cursor(cursor)
+        op = "lt" if desc else "gt"
+        value, last_id = quote(value), quote(last_id)
+        query = query.or_(f'{sort_column}.{op}.{value},and({sort_column}.eq.{value},id.{op}.{last_id})')
+
+    rows = query.order(sort_column, desc=desc).order("id", desc=desc).limit(limit + 1).execute().data
+    # One extra row was requested to tell whether another page exists
+    next_cursor = encode_cursor(rows[limit - 1], sort_column) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+# ==========================================
+# RESPONSES
+# ==========================================
+
+def respond(data, **meta):
+    """Envelope, ?fields= selection, orjson encoding and a conditional ETag."""
+    fields = request.args.get('fields')
+    if fields:
+        data = select_fields(data, parse_fields(fields))
+
+    body = current_app.json.dump_bytes({"data": data, **meta})
+    response = current_app.response_class(body, mimetype="application/json")
+    response.set_etag(hashlib.blake2b(body, digest_size=16).hexdigest())
+    # Private to the user; the client may keep it but must revalidate
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response.make_conditional(request)
+
+
+def own_course(course_id, columns="id"):
+    rows = supabase.table("courses").select(columns)\
+        .eq("id", course_id)\
+        .eq("instructor_id", session['user_id'])\
+        .limit(1)\
+        .execute().data
+    if not rows:
+        raise ApiError("Course not found.", 404)
+    return rows[0]
+
+
+# ==========================================
+# AUTH
+# ==========================================
+
+@bp.route('/login', methods=['POST'])
+def login():
+    body = request.get_json(silent=True) or {}
+    if not body.get('email') or not body.get('password'):
+        raise ApiError("Email and password are required.")
+
+    try:
+        auth_response = supabase.auth.sign_in_with_password({"email": body['email'], "password": body['password']})
+    except Exception:
+        raise ApiError("Invalid credentials.", 401)
+    user_id = auth_response.user.id
+    users = supabase.table("users").select("role, full_name").eq("id", user_id).limit(1).execute().data
+    if not users:
+        raise ApiError("No profile found for this account.", 403)
+    user = users[0]
+
+    session['user_id'] = user_id
+    session['role'] = user['role']
+    session['full_name'] = user['full_name']
+
+    return {"data": {
+        "user_id": user_id,
+        "role": user['role'],
+        "full_name": user['full_name'],
+        "session": {
+            "access_token": auth_response.session.access_token,
+            "expires_at": auth_response.session.expires_at,
+        },
+    }}
+
+
+@bp.route('/logout', methods=['POST'])
+def logout():
+    session.clear()
+    return "", 204
+
+
+# ==========================================
+# DASHBOARDS
+# ==========================================
+
+@bp.route('/dashboard')
+@login_required()
+def dashboard():
+    user_id = session['user_id']
+
+    if session['role'] == 'instructor':
+        courses = supabase.table("courses").select("id", count="exact").eq("instructor_id", user_id).limit(1).execute()
+        students = supabase.table("student_profiles").select("user_id", count="exact").limit(1).execute()
+        activity = supabase.table("exam_results")\
+            .select("id, score, submitted_at, users(full_name), courses!inner(title, instructor_id)")\
+            .eq("courses.instructor_id", user_id)\
+            .order("submitted_at", desc=True)\
+            .limit(5)\
+            .execute().data
+        return respond({"courses": courses.count, "students": students.count, "recent_activity": activity})
+
+    stats = supabase.table("users").select("points, level, current_badge").eq("id", user_id).single().execute().data
+    ahead = supabase.table("users").select("id", count="exact")\
+        .gt("points", stats['points'] or 0)\
+        .eq("role", "student")\
+        .limit(1)\
+        .execute().count
+    enrolled = supabase.table("enrollments")\
+        .select("course_id, courses(id, title, category)")\
+        .eq("student_id", user_id)\
+        .execute().data
+    return respond({
+        **stats,
+        "rank": (ahead or 0) + 1,
+        "xp": xp.xp_summary(user_id),
+        "courses": [row['courses'] for row in enrolled if row.get('courses')],
+    })
+
+
+# ==========================================
+# COURSES & QUIZZES
+# ==========================================
+
+@bp.route('/courses')
+@login_required()
+def courses():
+    """Instructors: the courses they teach. Students: the courses they're enrolled in."""
+    if session['role'] == 'instructor':
+        query = supabase.table("courses")\
+            .select("id, title, category, description, created_at")\
+            .eq("instructor_id", session['user_id'])
+    else:
+        query = supabase.table("courses")\
+            .select("id, title, category, description, created_at, enrollments!inner(student_id)")\
+            .eq("enrollments.student_id", session['user_id'])
+
+    rows, next_cursor = paginate(query, "created_at")
+    for row in rows:
+        row.pop('enrollments', None)
+    return respond(rows, next_cursor=next_cursor)
+
+
+@bp.route('/courses/<course_id>')
+@login_required()
+def course(course_id):
+    query = supabase.table("courses").select("id, title, category, description, created_at, quizzes(id, title, duration_minutes, max_attempts, is_active, created_at)")\
+        .eq("id", course_id)
+    if session['role'] == 'instructor':
+        query = query.eq("instructor_id", session['user_id'])
+    else:
+        query = query.eq("quizzes.is_active", True)
+
+    rows = query.limit(1).execute().data
+    if not rows:
+        raise ApiError("Course not found.", 404)
+    return respond(rows[0])
+
+
+@bp.route('/quizzes/<quiz_id>')
+@login_required()
+def quiz(quiz_id):
+    """The quiz and its questions. Students get them without answer keys, plus their attempt state.
+
+    Reading the quiz doesn't start an attempt; the take-quiz page does.
+    """
+    rows = supabase.table("quizzes")\
+        .select("id, course_id, title, duration_minutes, max_attempts, is_active, courses!inner(instructor_id)")\
+        .eq("id", quiz_id)\
+        .limit(1)\
+        .execute().data
+    if not rows:
+        raise ApiError("Quiz not found.", 404)
+    quiz = rows[0]
+    instructor_id = quiz.pop('courses')['instructor_id']
+    questions = supabase.table("questions").select("*").eq("quiz_id", quiz_id).order("id").execute().data
+
+    if session['role'] == 'instructor':
+        if instructor_id != session['user_id']:
+            raise ApiError("Quiz not found.", 404)
+        return respond({**quiz, "questions": questions})
+
+    if not quiz['is_active']:
+        raise ApiError("Quiz not found.", 404)
+    ledger = attempts.get_ledger(session['user_id'], quiz_id)
+    if attempts.is_expired(ledger, quiz):
+        submissions.auto_submit(session['user_id'], quiz_id, ledger['in_progress_id'])
+        ledger = attempts.get_ledger(session['user_id'], quiz_id)
+    can_take, message = attempts.check_eligibility(ledger, quiz)
+    return respond({
+        **quiz,
+        "questions": grading.student_questions(questions),
+        "attempts_used": ledger['attempts_used'],
+        "can_take": can_take,
+        "message": message,
+    })
+
+
+# ==========================================
+# RESULTS & GRADEBOOKS
+# ==========================================
+
+@bp.route('/results')
+@login_required('student')
+def my_results():
+    query = supabase.table("exam_results")\
+        .select("id, quiz_id, score, passed, feedback, submitted_at, quizzes(title, course_id)")\
+        .eq("student_id", session['user_id'])
+    rows, next_cursor = paginate(query, "submitted_at")
+    return respond(rows, next_cursor=next_cursor)
+
+
+@bp.route('/quizzes/<quiz_id>/results')
+@login_required('instructor')
+def quiz_results(quiz_id):
+    query = supabase.table("exam_results")\
+        .select("id, student_id, score, passed, violation_count, feedback, submitted_at, users(full_name), quizzes!inner(courses!inner(instructor_id))")\
+        .eq("quiz_id", quiz_id)\
+        .eq("quizzes.courses.instructor_id", session['user_id'])
+    rows, next_cursor = paginate(query, "submitted_at")
+    for row in rows:
+        row.pop('quizzes', None)
+    return respond(rows, next_cursor=next_cursor)
+
+
+@bp.route('/results/<result_id>')
+@login_required()
+def result(result_id):
+    """One attempt with its question-by-question report."""
+    rows = supabase.table("exam_results")\
+        .select("id, student_id, quiz_id, score, passed, feedback, submitted_at, answers, quizzes!inner(title, course_id, courses!inner(title, instructor_id))")\
+        .eq("id", result_id)\
+        .limit(1)\
+        .execute().data
+    if not rows:
+        raise ApiError("Result not found.", 404)
+    result = rows[0]
+    course = result['quizzes'].pop('courses')
+    owner = result['student_id'] if session['role'] == 'student' else course['instructor_id']
+    if owner != session['user_id']:
+        raise ApiError("Result not found.", 404)
+
+    answers = result.pop('answers') or {}
+    if isinstance(answers, str):
+        try:
+            answers = json.loads(answers)
+        except ValueError:
+            answers = {}
+    questions = supabase.table("questions").select("*").eq("quiz_id", result['quiz_id']).execute().data
+    return respond({**result, "course_title": course['title'], "report": grading.build_report(questions, answers)})
+
+
+@bp.route('/grades')
+@login_required('student')
+def my_grades():
+    target_ca = request.args.get('ca', grades.DEFAULT_TARGET_CA, type=int)
+    summaries = grades.course_summaries(session['user_id'], target_ca)
+    return respond({"courses": summaries, "stats": grades.overall_stats(summaries), "target_ca": target_ca})
+
+
+@bp.route('/courses/<course_id>/gradebook')
+@login_required('instructor')
+def course_gradebook(course_id):
+    """Every enrolled student's totals and latest score per quiz, from the materialised gradebook."""
+    own_course(course_id)
+    quizzes = supabase.table("quizzes").select("id, title").eq("course_id", course_id).order("created_at").execute().data
+    totals = gradebook.course_totals(course_id)
+
+    scores = {}
+    for cell in gradebook.course_cells(course_id):
+        scores.setdefault(cell['student_id'], {})[cell['quiz_id']] = cell['latest_score']
+
+    students = []
+    for entry in roster.course_roster(course_id):
+        student_totals = totals.get(entry.student_id, {})
+        students.append({
+            "student_id": entry.student_id,
+            "name": entry.name,
+            "email": entry.email,
+            "school_id": entry.school_id,
+            "attempts": student_totals.get('attempts', 0),
+            "score_sum": student_totals.get('score_sum', 0),
+            "latest_total": student_totals.get('latest_total', 0),
+            "scores": scores.get(entry.student_id, {}),
+        })
+    return respond({"quizzes": quizzes, "students": students})
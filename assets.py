@@ -0,0 +1,49 @@
+import hashlib
+import os
+
+from flask import current_app, request
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def build_manifest(static_folder):
+    """Map every file under the static folder to a short content hash."""
+    manifest = {}
+    if not static_folder or not os.path.isdir(static_folder):
+        return manifest
+
+    for root, _dirs, files in os.walk(static_folder):
+        for name in files:
+            path = os.path.join(root, name)
+            filename = os.path.relpath(path, static_folder).replace(os.sep, "/")
+            with open(path, "rb") as f:
+                manifest[filename] = hashlib.sha256(f.read()).hexdigest()[:12]
+    return manifest
+
+
+def init_app(app):
+    """Hash static assets at startup and serve fingerprinted URLs as immutable."""
+    app.extensions["asset_manifest"] = build_manifest(app.static_folder)
+    app.url_defaults(fingerprint_static_url)
+    app.after_request(cache_fingerprinted_asset)
+
+
+def fingerprint_static_url(endpoint, values):
+    """url_for('static', filename=...) -> /static/<filename>?v=<hash>."""
+    if endpoint != "static" or "filename" not in values:
+        return
+    digest = current_app.extensions["asset_manifest"].get(values["filename"])
+    if digest:
+        values["v"] = digest
+
+
+def cache_fingerprinted_asset(response):
+    """Let browsers keep a static file forever when its URL carries the current hash."""
+    if request.endpoint != "static" or response.status_code not in (200, 304):
+        return response
+
+    filename = (request.view_args or {}).get("filename")
+    digest = current_app.extensions["asset_manifest"].get(filename)
+    if digest and request.args.get("v") == digest:
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    return response
@@ -0,0 +1,149 @@
+import re
+import threading
+
+import httpx
+from flask import current_app
+from werkzeug.local import LocalProxy
+
+import transport
+
+CLIENT_HEADERS = {"X-Client-Info": "skilltrack"}
+# Same auth flow as supabase-py's ClientOptions default
+AUTH_FLOW_TYPE = "pkce"
+
+_client_lock = threading.Lock()
+
+
+class BackendError(Exception):
+    pass
+
+
+class SupabaseBackend:
+    """Supabase client that only imports what the app actually uses.
+
+    ``supabase.create_client`` imports storage3 (which pulls in pyiceberg),
+    realtime and functions before returning, roughly doubling a worker's
+    import time and RSS. Every route here only needs auth and PostgREST, so
+    those two are built directly and the full client is only created if
+    ``storage``, ``functions`` or ``realtime`` are touched.
+
+    Auth and PostgREST share ``http_client`` so the whole worker uses one
+    connection pool (see transport.py).
+    """
+
+    def __init__(self, url, key, http_client=None):
+        if not url:
+            raise BackendError("SUPABASE_URL is required")
+        if not key:
+            raise BackendError("SUPABASE_KEY is required")
+        if not re.match(r"^(https?)://.+", url):
+            raise BackendError("Invalid SUPABASE_URL")
+
+        from supabase_auth import SyncGoTrueClient, SyncMemoryStorage
+
+        self.url = url.rstrip("/")
+        self.key = key
+        self.http_client = http_client
+        self.headers = {**CLIENT_HEADERS, "apiKey": key, "Authorization": f"Bearer {key}"}
+
+        self.auth = SyncGoTrueClient(
+            url=f"{self.url}/auth/v1",
+            headers=dict(self.headers),
+            storage=SyncMemoryStorage(),
+            flow_type=AUTH_FLOW_TYPE,
+            http_client=http_client,
+        )
+        self.auth.on_auth_state_change(self._on_auth_event)
+        self._postgrest = None
+        self._full_client = None
+
+    @property
+    def postgrest(self):
+        if self._postgrest is None:
+            from postgrest import SyncPostgrestClient
+            self._postgrest = SyncPostgrestClient(
+                f"{self.url}/rest/v1", headers=self.headers, schema="public", http_client=self.http_client
+            )
+        return self._postgrest
+
+    def table(self, table_name):
+        return self.postgrest.from_(table_name)
+
+    from_ = table
+
+    def rpc(self, fn, params=None, count=None, head=False, get=False):
+        return self.postgrest.rpc(fn, params or {}, count, head, get)
+
+    # --- Rarely used services: fall back to the full supabase client ---
+
+    @property
+    def full_client(self):
+        if self._full_client is None:
+            from supabase import create_client
+            self._full_client = create_client(self.url, self.key)
+        return self._full_client
+
+    @property
+    def storage(self):
+        return self.full_client.storage
+
+    @property
+    def functions(self):
+        return self.full_client.functions
+
+    @property
+    def realtime(self):
+        return self.full_client.realtime
+
+    def _on_auth_event(self, event, session):
+        # Same behaviour as supabase-py: requests follow the signed-in user's token
+        access_token = self.key
+        if event in ["SIGNED_IN", "TOKEN_REFRESHED", "SIGNED_OUT"]:
+            self._postgrest = None
+            access_token = session.access_token if session else self.key
+        self.headers["Authorization"] = f"Bearer {access_token}"
+
+
+def init_app(app):
+    """Register the backend; the client itself is built on first use."""
+    app.extensions["backend"] = None
+    app.register_error_handler(transport.BackendUnavailable, backend_unavailable)
+    app.register_error_handler(httpx.TimeoutException, backend_unavailable)
+
+
+def backend_unavailable(e):
+    """Turn a tripped breaker or backend timeout into a 503 instead of a traceback."""
+    retry_after = getattr(e, "retry_after", 0) or 5
+    return "SkillTrack is having trouble reaching its database. Please try again in a moment.", 503, {
+        "Retry-After": str(retry_after)
+    }
+
+
+def get_client():
+    """Return the app's backend client, creating it on first use."""
+    app = current_app._get_current_object()
+    client = app.extensions.get("backend")
+    if client is None:
+        with _client_lock:
+            client = app.extensions.get("backend")
+            if client is None:
+                client = SupabaseBackend(
+                    app.config["SUPABASE_URL"],
+                    app.config["SUPABASE_KEY"],
+                    http_client=transport.build_http_client(app.config),
+                )
+                app.extensions["backend"] = client
+    return client
+
+
+def preload():
+    """Import the backend client libraries without opening any connections.
+
+    Called from the gunicorn master with ``preload_app`` so forked workers
+    share the imported modules instead of each paying for them.
+    """
+    import postgrest  # noqa: F401
+    import supabase_auth  # noqa: F401
+
+
+supabase = LocalProxy(get_client)
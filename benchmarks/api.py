@@ -0,0 +1,108 @@
+"""JSON API payloads: response size and encode time, stdlib json vs orjson.
+
+    python benchmarks/api.py [--runs N] [--students N] [--quizzes N]
+
+Columns, per payload:
+  bytes        encoded size of the full response
+  gzip         size on the wire with response compression
+  fields       size with a typical ?fields= selection
+  json ms      median stdlib json.dumps (what jsonify used before fastjson.py)
+  orjson ms    median encode through the app's JSON provider
+
+Payloads are synthetic but shaped like the real endpoints (api.py).
+"""
+import argparse
+import gzip
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "bench-key")
+
+from api import parse_fields, select_fields  # noqa: E402
+from app import create_app  # noqa: E402
+
+
+def gradebook_payload(students, quizzes):
+    quiz_rows = [{"id": str(uuid.uuid4()), "title": f"Quiz {q + 1}"} for q in range(quizzes)]
+    return {"quizzes": quiz_rows, "students": [{
+        "student_id": str(uuid.uuid4()),
+        "name": f"Student {s}",
+        "email": f"student{s}@example.edu",
+        "school_id": f"STU{s:05d}",
+        "attempts": quizzes,
+        "score_sum": 70 * quizzes,
+        "latest_total": 70 * quizzes,
+        "scores": {q["id"]: (s * 7 + i * 13) % 101 for i, q in enumerate(quiz_rows)},
+    } for s in range(students)]}
+
+
+def results_page(rows):
+    return [{
+        "id": str(uuid.uuid4()),
+        "quiz_id": str(uuid.uuid4()),
+        "score": i % 101,
+        "passed": i % 3 != 0,
+        "feedback": None if i % 4 else "Good work, revise chapter 3.",
+        "submitted_at": f"2026-01-{1 + i % 28:02d}T10:{i % 60:02d}:00.123456+00:00",
+        "quizzes": {"title": f"Quiz {i % 20}", "course_id": str(uuid.uuid4())},
+    } for i in range(rows)]
+
+
+def quiz_payload(questions):
+    return {
+        "id": str(uuid.uuid4()), "title": "Midterm", "duration_minutes": 60, "max_attempts": 2,
+        "questions": [{
+            "id": str(i), "text": f"Question {i}: which of the following is correct?", "question_type": "MCQ",
+            "options": [{"code": c, "text": f"Option {c} for question {i}"} for c in "ABCD"],
+        } for i in range(questions)],
+        "attempts_used": 0, "can_take": True, "message": "",
+    }
+
+
+def median_ms(fn, runs):
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--quizzes", type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_app({"TEMPLATE_CACHE_DIR": ""})
+
+    # (name, data, typical ?fields=)
+    payloads = [
+        ("course gradebook", gradebook_payload(args.students, args.quizzes), "quizzes,students.name,students.scores"),
+        ("results page (200)", results_page(200), "id,score,submitted_at,quizzes.title"),
+        ("quiz (50 questions)", quiz_payload(50), "id,title,questions"),
+    ]
+
+    fmt = "{:<22} {:>10} {:>9} {:>9} {:>9} {:>10}"
+    print(fmt.format("payload", "bytes", "gzip", "fields", "json ms", "orjson ms"))
+    for name, data, fields in payloads:
+        body = app.json.dump_bytes({"data": data})
+        selected = app.json.dump_bytes({"data": select_fields(data, parse_fields(fields))})
+        stdlib_ms = median_ms(lambda: json.dumps({"data": data}).encode(), args.runs)
+        orjson_ms = median_ms(lambda: app.json.dump_bytes({"data": data}), args.runs)
+        print(fmt.format(
+            name, len(body), len(gzip.compress(body, compresslevel=app.config["COMPRESS_LEVEL"])),
+            len(selected), f"{stdlib_ms:.2f}", f"{orjson_ms:.2f}",
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Worker startup cost: import time and peak RSS of a fresh interpreter.
+
+    python benchmarks/startup.py [--runs N]
+
+Each scenario runs in its own subprocess so nothing is shared between them.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PRELUDE = "import resource, time\nt0 = time.perf_counter()\n"
+REPORT = "print(time.perf_counter() - t0, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)\n"
+
+SCENARIOS = {
+    # What every worker paid before the factory: the full supabase client at import
+    "eager supabase client": (
+        "import flask\n"
+        "from supabase import create_client\n"
+        "create_client('http://localhost:54321', 'bench-key')\n"
+    ),
+    "create_app()": (
+        "from app import create_app\n"
+        "create_app()\n"
+    ),
+    "create_app() + first backend use": (
+        "from app import create_app\n"
+        "import backend\n"
+        "app = create_app()\n"
+        "with app.app_context():\n"
+        "    backend.supabase.table('users').select('id')\n"
+    ),
+}
+
+
+def run_scenario(code):
+    env = dict(os.environ, SUPABASE_URL="http://localhost:54321", SUPABASE_KEY="bench-key")
+    out = subprocess.run(
+        [sys.executable, "-c", PRELUDE + code + REPORT],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    ).stdout.split()
+    return float(out[0]), int(out[1]) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'scenario':<36} {'startup ms':>11} {'peak RSS MB':>12}")
+    for name, code in SCENARIOS.items():
+        samples = [run_scenario(code) for _ in range(args.runs)]
+        startup = statistics.median(s[0] for s in samples) * 1000
+        rss = statistics.median(s[1] for s in samples)
+        print(f"{name:<36} {startup:>11.1f} {rss:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
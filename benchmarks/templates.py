@@ -0,0 +1,91 @@
+"""Template cost per page: compile vs bytecode-cache load, first vs warm render.
+
+    python benchmarks/templates.py [--runs N]
+
+Columns, per template (ms):
+  compile      parse + compile from source (what a cold worker paid)
+  cached load  load from a warm on-disk bytecode cache (templating.py)
+  first render first render of a freshly loaded template
+  warm render  median of later renders
+
+Templates are rendered with empty context and permissive undefineds, so the
+render numbers measure template overhead, not real data; "-" means the
+template can't render without real data.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from jinja2 import ChainableUndefined, FileSystemBytecodeCache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "bench-key")
+
+from app import create_app  # noqa: E402
+
+
+def fresh_env(app, bytecode_cache=None):
+    """A new environment with the app's filters and globals and nothing cached."""
+    env = app.create_jinja_environment()
+    env.filters.update(app.jinja_env.filters)
+    env.globals.update(app.jinja_env.globals)
+    env.undefined = ChainableUndefined
+    env.bytecode_cache = bytecode_cache
+    return env
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - t0) * 1000, result
+
+
+def render_ms(template, runs):
+    try:
+        first, _ = timed(template.render)
+        warm = statistics.median(timed(template.render)[0] for _ in range(runs))
+    except Exception:
+        return None, None
+    return first, warm
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_app({"TEMPLATE_CACHE_DIR": ""})
+    names = app.jinja_env.list_templates(extensions=["html"])
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = FileSystemBytecodeCache(cache_dir)
+        # Fill the on-disk cache once
+        warm_env = fresh_env(app, cache)
+        for name in names:
+            warm_env.get_template(name)
+
+        fmt = "{:<36} {:>9} {:>12} {:>13} {:>12}"
+        print(fmt.format("template", "compile", "cached load", "first render", "warm render"))
+        totals = [0.0, 0.0]
+        with app.test_request_context():
+            for name in names:
+                compile_ms = statistics.median(timed(lambda: fresh_env(app).get_template(name))[0] for _ in range(3))
+                load_ms, template = timed(lambda: fresh_env(app, cache).get_template(name))
+                first, warm = render_ms(template, args.runs)
+                totals[0] += compile_ms
+                totals[1] += load_ms
+                print(fmt.format(
+                    name, f"{compile_ms:.2f}", f"{load_ms:.2f}",
+                    "-" if first is None else f"{first:.2f}",
+                    "-" if warm is None else f"{warm:.2f}",
+                ))
+        print(fmt.format("total", f"{totals[0]:.1f}", f"{totals[1]:.1f}", "", ""))
+
+
+if __name__ == "__main__":
+    main()
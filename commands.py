@@ -0,0 +1,60 @@
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+import analytics_export
+import submission_queue
+import templating
+from services import gradebook
+
+
+def init_app(app):
+    """Register maintenance commands with ``flask``."""
+    app.cli.add_command(rebuild_gradebook)
+    app.cli.add_command(drain_submissions)
+    app.cli.add_command(export_analytics)
+    app.cli.add_command(compile_templates)
+
+
+@click.command("rebuild-gradebook")
+@click.option("--course", "course_id", default=None, help="Only rebuild this course.")
+@with_appcontext
+def rebuild_gradebook(course_id):
+    """Recompute the materialised gradebook from exam_results."""
+    cells = gradebook.rebuild(course_id)
+    click.echo(f"Rebuilt {cells} gradebook cells.")
+
+
+@click.command("drain-submissions")
+@with_appcontext
+def drain_submissions():
+    """Flush every buffered quiz submission to exam_results."""
+    queue = submission_queue.get_queue()
+    if queue is None:
+        raise click.ClickException("SUBMISSION_MODE is not \"buffered\"; there is no queue to drain.")
+
+    total = 0
+    while True:
+        flushed = submission_queue.drain_once(queue, current_app.config["SUBMISSION_DRAIN_BATCH"])
+        if not flushed:
+            break
+        total += flushed
+    click.echo(f"Flushed {total} submissions.")
+
+
+@click.command("export-analytics")
+@click.option("--warehouse", default=None, help="Warehouse directory (default: ANALYTICS_WAREHOUSE_DIR).")
+@with_appcontext
+def export_analytics(warehouse):
+    """Append new results and XP to the local Iceberg warehouse and refresh enrollments."""
+    counts = analytics_export.export_all(warehouse)
+    for table, rows in counts.items():
+        click.echo(f"{table}: {rows} rows")
+
+
+@click.command("compile-templates")
+@with_appcontext
+def compile_templates():
+    """Fill the template bytecode cache, e.g. as a deploy step."""
+    loaded = templating.precompile(current_app)
+    click.echo(f"Compiled {loaded} templates.")
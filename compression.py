@@ -0,0 +1,42 @@
+import gzip
+
+from flask import current_app, request
+
+# Dynamic responses worth compressing. Static files are served with
+# direct_passthrough and long-lived caching instead (see assets.py).
+COMPRESSIBLE_MIMETYPES = {"text/html", "application/json", "text/csv"}
+
+
+def init_app(app):
+    """Register gzip compression for HTML/JSON/CSV responses."""
+    app.config.setdefault("COMPRESS_LEVEL", 6)
+    app.config.setdefault("COMPRESS_MIN_SIZE", 500)
+    app.after_request(compress_response)
+
+
+def compress_response(response):
+    """Gzip the response body if the client accepts it and it is big enough."""
+    if response.status_code < 200 or response.status_code >= 300 or response.status_code == 204:
+        return response
+    if response.direct_passthrough or response.is_streamed:
+        return response
+    if "Content-Encoding" in response.headers:
+        return response
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    if request.accept_encodings["gzip"] <= 0:
+        return response
+
+    data = response.get_data()
+    if len(data) < current_app.config["COMPRESS_MIN_SIZE"]:
+        return response
+
+    response.set_data(gzip.compress(data, compresslevel=current_app.config["COMPRESS_LEVEL"], mtime=0))
+    response.headers["Content-Encoding"] = "gzip"
+    response.vary.add("Accept-Encoding")
+
+    # The compressed body is a different representation of the same resource
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
@@ -0,0 +1,91 @@
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class Config:
+    """Default settings, read from the environment (.env is loaded first)."""
+
+    SECRET_KEY = os.environ.get("SECRET_KEY", "skilltrack_secret_key")  # Needed for flash messages
+
+    # Backend
+    SUPABASE_URL = os.environ.get("SUPABASE_URL")
+    SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
+
+    # Backend HTTP transport (see transport.py)
+    BACKEND_HTTP2 = os.environ.get("BACKEND_HTTP2", "1") == "1"
+    BACKEND_MAX_CONNECTIONS = int(os.environ.get("BACKEND_MAX_CONNECTIONS", 20))
+    BACKEND_MAX_KEEPALIVE = int(os.environ.get("BACKEND_MAX_KEEPALIVE", 10))
+    BACKEND_KEEPALIVE_EXPIRY = float(os.environ.get("BACKEND_KEEPALIVE_EXPIRY", 30))
+    BACKEND_CONNECT_TIMEOUT = float(os.environ.get("BACKEND_CONNECT_TIMEOUT", 3))
+    BACKEND_READ_TIMEOUT = float(os.environ.get("BACKEND_READ_TIMEOUT", 10))
+    BACKEND_WRITE_TIMEOUT = float(os.environ.get("BACKEND_WRITE_TIMEOUT", 10))
+    BACKEND_POOL_TIMEOUT = float(os.environ.get("BACKEND_POOL_TIMEOUT", 5))
+    BACKEND_RETRY_ATTEMPTS = int(os.environ.get("BACKEND_RETRY_ATTEMPTS", 3))
+    BACKEND_RETRY_BACKOFF = float(os.environ.get("BACKEND_RETRY_BACKOFF", 0.2))
+    BACKEND_RETRY_MAX_BACKOFF = float(os.environ.get("BACKEND_RETRY_MAX_BACKOFF", 2))
+    BACKEND_BREAKER_THRESHOLD = int(os.environ.get("BACKEND_BREAKER_THRESHOLD", 5))
+    BACKEND_BREAKER_RESET = float(os.environ.get("BACKEND_BREAKER_RESET", 30))
+
+    # Large IN-list reads (fetching.py): per-request URL budget for the id list, and
+    # how many chunks a worker fetches at once
+    FETCH_IN_MAX_CHARS = int(os.environ.get("FETCH_IN_MAX_CHARS", 4000))
+    FETCH_MAX_WORKERS = int(os.environ.get("FETCH_MAX_WORKERS", 4))
+
+    # Single-flight reads (transport.py): identical concurrent GETs share one backend call.
+    # WINDOW also reuses a finished result for that many seconds; DIR (a local directory)
+    # coalesces across the workers on one host as well
+    SINGLE_FLIGHT = os.environ.get("SINGLE_FLIGHT", "1") == "1"
+    SINGLE_FLIGHT_WINDOW = float(os.environ.get("SINGLE_FLIGHT_WINDOW", 0))
+    SINGLE_FLIGHT_DIR = os.environ.get("SINGLE_FLIGHT_DIR", "")
+
+    # Quiz submissions: "direct" writes exam_results in the request,
+    # "buffered" queues them locally and a background drainer batches the writes
+    SUBMISSION_MODE = os.environ.get("SUBMISSION_MODE", "direct")
+    SUBMISSION_QUEUE_PATH = os.environ.get("SUBMISSION_QUEUE_PATH", os.path.join("instance", "submission_queue.sqlite3"))
+    SUBMISSION_DRAIN_BATCH = int(os.environ.get("SUBMISSION_DRAIN_BATCH", 100))
+    SUBMISSION_DRAIN_INTERVAL = float(os.environ.get("SUBMISSION_DRAIN_INTERVAL", 1))
+    SUBMISSION_LEASE_SECONDS = float(os.environ.get("SUBMISSION_LEASE_SECONDS", 60))
+    SUBMISSION_MAX_ATTEMPTS = int(os.environ.get("SUBMISSION_MAX_ATTEMPTS", 8))  # then the row is parked as "dead"
+
+    # In-memory roster/attempt bitmaps (services/membership.py): seconds before a course is reloaded,
+    # and between checks for writes made by other workers
+    MEMBERSHIP_INDEX_TTL = float(os.environ.get("MEMBERSHIP_INDEX_TTL", 300))
+    MEMBERSHIP_INDEX_REVALIDATE = float(os.environ.get("MEMBERSHIP_INDEX_REVALIDATE", 10))
+
+    # Instructor activity feed (activity_feed.py): "realtime" shares one Supabase Realtime
+    # subscription per worker; "local" only sees results saved by the same worker, so it is
+    # refused when gunicorn runs more than one. Every open dashboard holds one of the worker's
+    # GUNICORN_THREADS (gunicorn.conf.py), so at most ACTIVITY_MAX_STREAMS do - half by default,
+    # leaving the rest for page requests; further dashboards are turned away and retry
+    ACTIVITY_FEED_SOURCE = os.environ.get("ACTIVITY_FEED_SOURCE", "realtime")
+    ACTIVITY_MAX_STREAMS = int(os.environ.get("ACTIVITY_MAX_STREAMS", int(os.environ.get("GUNICORN_THREADS", 32)) // 2))
+    ACTIVITY_MAX_PENDING = int(os.environ.get("ACTIVITY_MAX_PENDING", 100))
+    ACTIVITY_HEARTBEAT_SECONDS = float(os.environ.get("ACTIVITY_HEARTBEAT_SECONDS", 15))
+    ACTIVITY_STREAM_MAX_SECONDS = float(os.environ.get("ACTIVITY_STREAM_MAX_SECONDS", 300))
+
+    # Cached course rosters (services/roster.py): seconds before a course is re-read
+    ROSTER_CACHE_TTL = float(os.environ.get("ROSTER_CACHE_TTL", 300))
+
+    # JSON API (api.py): default and largest page for ?limit=
+    API_PAGE_SIZE = int(os.environ.get("API_PAGE_SIZE", 50))
+    API_MAX_PAGE_SIZE = int(os.environ.get("API_MAX_PAGE_SIZE", 200))
+
+    # Analytics export (flask export-analytics): local Iceberg tables of Parquet files
+    ANALYTICS_WAREHOUSE_DIR = os.environ.get("ANALYTICS_WAREHOUSE_DIR", os.path.join("instance", "analytics"))
+    ANALYTICS_EXPORT_LAG_SECONDS = int(os.environ.get("ANALYTICS_EXPORT_LAG_SECONDS", 600))
+
+    # On-demand request profiling (profiling.py); off unless a token or sample rate is set
+    PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN")
+    PROFILE_SAMPLE_RATE = int(os.environ.get("PROFILE_SAMPLE_RATE", 0))  # profile 1 in N requests
+    PROFILE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL", 0.001))
+    PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join("instance", "profiles"))
+
+    # Compiled Jinja templates, shared by every worker (templating.py); empty disables
+    TEMPLATE_CACHE_DIR = os.environ.get("TEMPLATE_CACHE_DIR", os.path.join("instance", "jinja_cache"))
+
+    # Response compression
+    COMPRESS_LEVEL = int(os.environ.get("COMPRESS_LEVEL", 6))
+    COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", 500))
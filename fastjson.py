@@ -0,0 +1,33 @@
+import orjson
+from flask.json.provider import DefaultJSONProvider
+
+# Allow int keys like the stdlib encoder does. Keys are not sorted: clients
+# don't depend on the order and sorting is a large share of encode time.
+DUMPS_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask's JSON provider on orjson: ``jsonify``, ``request.json`` and the API.
+
+    Anything orjson can't encode natively (``Decimal``, objects with
+    ``__html__``) goes through Flask's default handler. Unlike the stdlib
+    provider, dates come out as ISO 8601, the same format the backend uses.
+    """
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=DUMPS_OPTIONS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def dump_bytes(self, obj):
+        """Encoded bytes, without the round trip through ``str``."""
+        return orjson.dumps(obj, default=self.default, option=DUMPS_OPTIONS)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dump_bytes(obj), mimetype=self.mimetype)
+
+
+def init_app(app):
+    app.json = OrjsonProvider(app)
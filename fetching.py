@@ -0,0 +1,114 @@
+import heapq
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+# PostgREST's default max-rows. The server may be set to return fewer, so a
+# short page doesn't mean there's nothing left; only an empty one does.
+PAGE_SIZE = 1000
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def fetch_all(build_query, page_size=PAGE_SIZE):
+    """Every row of a query, paged past the server's row cap.
+
+    ``build_query()`` must return a fresh, ordered query builder each call.
+    """
+    rows, offset = [], 0
+    while True:
+        page = build_query().range(offset, offset + page_size - 1).execute().data
+        if not page:
+            return rows
+        rows.extend(page)
+        offset += len(page)
+
+
+def chunk_ids(ids, max_chars):
+    """Split ids into lists whose comma-joined length stays under ``max_chars``.
+
+    Duplicates and None are dropped; order is kept.
+    """
+    chunks, chunk, length = [], [], 0
+    for value in dict.fromkeys(i for i in ids if i is not None):
+        size = len(str(value)) + 1
+        if chunk and length + size > max_chars:
+            chunks.append(chunk)
+            chunk, length = [], 0
+        chunk.append(value)
+        length += size
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def _get_executor(max_workers):
+    # Created on first use, so it belongs to the worker and not the preloading master
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch")
+    return _executor
+
+
+def iter_in(build_query, column, ids, order_by=None, desc=False, tiebreaker="id"):
+    """Stream rows where ``column`` is in ``ids``, however long the list.
+
+    The ids are split into chunks small enough for the request URL (see
+    FETCH_IN_MAX_CHARS). Each chunk is its own query, paged past the row
+    cap, and the chunks run concurrently on a pool of FETCH_MAX_WORKERS
+    threads shared by the worker. With ``order_by`` the per-chunk results,
+    each sorted by the server, are merged back into one sorted stream;
+    otherwise rows are yielded chunk by chunk as they arrive. Rows are also
+    ordered on ``tiebreaker``, a unique column, so offset pages of a chunk
+    can't skip or repeat rows that tie at a page boundary.
+    """
+    chunks = chunk_ids(ids, current_app.config["FETCH_IN_MAX_CHARS"])
+    if not chunks:
+        return
+
+    def fetch_chunk(chunk):
+        def build():
+            query = build_query().in_(column, chunk)
+            query = query.order(order_by, desc=desc) if order_by else query.order(column)
+            return query.order(tiebreaker, desc=desc)
+        return fetch_all(build)
+
+    if len(chunks) == 1:
+        yield from fetch_chunk(chunks[0])
+        return
+
+    app = current_app._get_current_object()
+
+    def run(chunk):
+        with app.app_context():
+            return fetch_chunk(chunk)
+
+    executor = _get_executor(current_app.config["FETCH_MAX_WORKERS"])
+    futures = [executor.submit(run, chunk) for chunk in chunks]
+    try:
+        if order_by:
+            yield from heapq.merge(*(_rows(f) for f in futures), key=lambda row: _sort_key(row[order_by]), reverse=desc)
+        else:
+            for future in futures:
+                yield from future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def _rows(future):
+    yield from future.result()
+
+
+def _sort_key(value):
+    # Nulls sort after every value, as PostgREST orders them (first when descending)
+    return (value is None, value)
+
+
+def fetch_in(build_query, column, ids, order_by=None, desc=False, tiebreaker="id"):
+    """``iter_in`` collected into a list."""
+    return list(iter_in(build_query, column, ids, order_by, desc, tiebreaker))
@@ -0,0 +1,23 @@
+import os
+
+# Load the app once in the master and fork workers from it, so each worker
+# starts with the backend libraries imported, the asset manifest built and
+# every template compiled.
+preload_app = True
+
+# Threaded workers, so a held-open activity feed (server-sent events) only
+# occupies one thread rather than a whole worker. A stream's thread is idle
+# between events, so threads are cheap here; ACTIVITY_MAX_STREAMS (half of
+# them by default) caps how many the feed may hold. Raising GUNICORN_THREADS
+# admits more dashboards at the cost of memory and GIL contention.
+threads = int(os.environ.get("GUNICORN_THREADS", 32))
+
+
+def on_starting(server):
+    import activity_feed
+    import backend
+    import templating
+    app = server.app.wsgi()
+    activity_feed.check_workers(app, server.cfg.workers)
+    backend.preload()
+    templating.precompile(app)
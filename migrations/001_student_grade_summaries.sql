@@ -0,0 +1,58 @@
+-- Per-course grade summary for one student, in a single round-trip.
+-- Used by services/grades.py (student grades page).
+--
+-- latest_score_total sums the most recent attempt on each quiz, which is
+-- what the CSV gradebook export averages over the course's quizzes.
+
+create or replace function student_grade_summaries(p_student_id uuid)
+returns json
+language sql
+stable
+as $$
+    with attempts as (
+        select q.course_id, r.quiz_id, r.score, r.feedback, r.submitted_at
+        from exam_results r
+        join quizzes q on q.id = r.quiz_id
+        where r.student_id = p_student_id
+    ),
+    latest as (
+        select distinct on (quiz_id) course_id, quiz_id, score
+        from attempts
+        order by quiz_id, submitted_at desc
+    ),
+    per_course as (
+        select course_id,
+               count(*) as attempts,
+               sum(score) as score_total,
+               max(score) as best_score,
+               round(avg(score)) as average_score,
+               count(*) filter (where coalesce(feedback, '') <> '') as feedback_count,
+               max(submitted_at) as last_submitted_at
+        from attempts
+        group by course_id
+    ),
+    per_course_latest as (
+        select course_id, count(*) as quizzes_attempted, sum(score) as latest_score_total
+        from latest
+        group by course_id
+    )
+    select coalesce(json_agg(s order by s.course_title), '[]'::json)
+    from (
+        select c.id as course_id,
+               c.title as course_title,
+               (select count(*) from quizzes q where q.course_id = c.id) as quiz_count,
+               coalesce(pc.attempts, 0) as attempts,
+               coalesce(pc.score_total, 0) as score_total,
+               coalesce(pc.best_score, 0) as best_score,
+               coalesce(pc.average_score, 0) as average_score,
+               coalesce(pc.feedback_count, 0) as feedback_count,
+               pc.last_submitted_at,
+               coalesce(pl.quizzes_attempted, 0) as quizzes_attempted,
+               coalesce(pl.latest_score_total, 0) as latest_score_total
+        from courses c
+        left join per_course pc on pc.course_id = c.id
+        left join per_course_latest pl on pl.course_id = c.id
+        where pc.course_id is not null
+           or c.id in (select course_id from enrollments where student_id = p_student_id)
+    ) s;
+$$;
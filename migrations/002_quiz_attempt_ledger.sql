@@ -0,0 +1,74 @@
+-- One row per (student, quiz): the only thing attempt eligibility reads.
+-- Used by services/attempts.py (quiz_start, take_quiz, submit_quiz).
+
+create table if not exists quiz_attempt_ledger (
+    student_id uuid not null references users(id) on delete cascade,
+    quiz_id uuid not null references quizzes(id) on delete cascade,
+    attempts_used integer not null default 0,
+    flagged boolean not null default false,
+    in_progress_id uuid,
+    started_at timestamptz,
+    primary key (student_id, quiz_id)
+);
+
+-- Seed from results submitted before the ledger existed
+insert into quiz_attempt_ledger (student_id, quiz_id, attempts_used, flagged)
+select student_id, quiz_id, count(*), bool_or(coalesce(violation_count, 0) > 0)
+from exam_results
+group by student_id, quiz_id
+on conflict (student_id, quiz_id) do update
+    set attempts_used = excluded.attempts_used,
+        flagged = excluded.flagged;
+
+
+-- Open an attempt if the student is still allowed one. Reloading the quiz
+-- page returns the attempt already in progress instead of opening another.
+-- The returned row has no in_progress_id when the student is not eligible.
+create or replace function start_quiz_attempt(p_student_id uuid, p_quiz_id uuid, p_max_attempts integer)
+returns quiz_attempt_ledger
+language plpgsql
+as $$
+declare
+    v_row quiz_attempt_ledger;
+begin
+    insert into quiz_attempt_ledger (student_id, quiz_id)
+    values (p_student_id, p_quiz_id)
+    on conflict (student_id, quiz_id) do nothing;
+
+    -- Row lock serialises concurrent starts for the same student and quiz
+    select * into v_row
+    from quiz_attempt_ledger
+    where student_id = p_student_id and quiz_id = p_quiz_id
+    for update;
+
+    if v_row.in_progress_id is null and not v_row.flagged and v_row.attempts_used < p_max_attempts then
+        update quiz_attempt_ledger
+        set in_progress_id = gen_random_uuid(), started_at = now()
+        where student_id = p_student_id and quiz_id = p_quiz_id
+        returning * into v_row;
+    end if;
+
+    return v_row;
+end;
+$$;
+
+
+-- Close the attempt being submitted. Returns false if that attempt is not
+-- the one in progress (already submitted, reposted, or never started).
+create or replace function finish_quiz_attempt(p_student_id uuid, p_quiz_id uuid, p_attempt_id uuid, p_violation_count integer)
+returns boolean
+language plpgsql
+as $$
+begin
+    update quiz_attempt_ledger
+    set attempts_used = attempts_used + 1,
+        flagged = flagged or p_violation_count > 0,
+        in_progress_id = null,
+        started_at = null
+    where student_id = p_student_id
+      and quiz_id = p_quiz_id
+      and in_progress_id = p_attempt_id;
+
+    return found;
+end;
+$$;
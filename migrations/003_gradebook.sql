@@ -0,0 +1,148 @@
+-- Materialised course gradebook, kept current on write by services/gradebook.py.
+--
+-- gradebook_cells:  one row per (student, quiz) with best/latest score.
+-- gradebook_totals: one row per (course, student) rolled up from the cells.
+--
+-- Gradebook pages and the CSV export read these instead of every attempt.
+
+create table if not exists gradebook_cells (
+    course_id uuid not null references courses(id) on delete cascade,
+    quiz_id uuid not null references quizzes(id) on delete cascade,
+    student_id uuid not null references users(id) on delete cascade,
+    attempts integer not null default 0,
+    score_sum integer not null default 0,
+    best_score integer not null default 0,
+    latest_score integer not null default 0,
+    latest_result_id uuid,
+    latest_submitted_at timestamptz,
+    primary key (quiz_id, student_id)
+);
+
+create index if not exists gradebook_cells_course_idx on gradebook_cells (course_id);
+
+create table if not exists gradebook_totals (
+    course_id uuid not null references courses(id) on delete cascade,
+    student_id uuid not null references users(id) on delete cascade,
+    quizzes_taken integer not null default 0,
+    attempts integer not null default 0,
+    score_sum integer not null default 0,
+    best_total integer not null default 0,
+    latest_total integer not null default 0,
+    primary key (course_id, student_id)
+);
+
+
+create or replace function refresh_gradebook_totals(p_course_id uuid, p_student_id uuid)
+returns void
+language plpgsql
+as $$
+begin
+    if not exists (select 1 from gradebook_cells where course_id = p_course_id and student_id = p_student_id) then
+        delete from gradebook_totals where course_id = p_course_id and student_id = p_student_id;
+        return;
+    end if;
+
+    insert into gradebook_totals (course_id, student_id, quizzes_taken, attempts, score_sum, best_total, latest_total)
+    select p_course_id, p_student_id, count(*), sum(attempts), sum(score_sum), sum(best_score), sum(latest_score)
+    from gradebook_cells
+    where course_id = p_course_id and student_id = p_student_id
+    on conflict (course_id, student_id) do update
+        set quizzes_taken = excluded.quizzes_taken,
+            attempts = excluded.attempts,
+            score_sum = excluded.score_sum,
+            best_total = excluded.best_total,
+            latest_total = excluded.latest_total;
+end;
+$$;
+
+
+-- Recompute one (student, quiz) cell from that student's attempts on that
+-- quiz, then their course total. Called after a submission or regrade.
+create or replace function refresh_gradebook_cell(p_student_id uuid, p_quiz_id uuid)
+returns void
+language plpgsql
+as $$
+declare
+    v_course_id uuid;
+begin
+    select course_id into v_course_id from quizzes where id = p_quiz_id;
+    if v_course_id is null then
+        return;
+    end if;
+
+    if not exists (select 1 from exam_results where student_id = p_student_id and quiz_id = p_quiz_id) then
+        delete from gradebook_cells where student_id = p_student_id and quiz_id = p_quiz_id;
+    else
+        insert into gradebook_cells (course_id, quiz_id, student_id, attempts, score_sum, best_score,
+                                     latest_score, latest_result_id, latest_submitted_at)
+        select v_course_id, p_quiz_id, p_student_id, count(*), sum(score), max(score),
+               (array_agg(score order by submitted_at desc))[1],
+               (array_agg(id order by submitted_at desc))[1],
+               max(submitted_at)
+        from exam_results
+        where student_id = p_student_id and quiz_id = p_quiz_id
+        on conflict (quiz_id, student_id) do update
+            set attempts = excluded.attempts,
+                score_sum = excluded.score_sum,
+                best_score = excluded.best_score,
+                latest_score = excluded.latest_score,
+                latest_result_id = excluded.latest_result_id,
+                latest_submitted_at = excluded.latest_submitted_at;
+    end if;
+
+    perform refresh_gradebook_totals(v_course_id, p_student_id);
+end;
+$$;
+
+
+-- Remove a quiz's column from its course gradebook before the quiz is deleted.
+create or replace function drop_gradebook_quiz(p_quiz_id uuid)
+returns void
+language plpgsql
+as $$
+declare
+    v_cell record;
+begin
+    for v_cell in
+        delete from gradebook_cells where quiz_id = p_quiz_id returning course_id, student_id
+    loop
+        perform refresh_gradebook_totals(v_cell.course_id, v_cell.student_id);
+    end loop;
+end;
+$$;
+
+
+-- Full rebuild from exam_results, for one course or (p_course_id null) all.
+create or replace function rebuild_gradebook(p_course_id uuid default null)
+returns integer
+language plpgsql
+as $$
+declare
+    v_cells integer;
+begin
+    delete from gradebook_totals where p_course_id is null or course_id = p_course_id;
+    delete from gradebook_cells where p_course_id is null or course_id = p_course_id;
+
+    insert into gradebook_cells (course_id, quiz_id, student_id, attempts, score_sum, best_score,
+                                 latest_score, latest_result_id, latest_submitted_at)
+    select q.course_id, r.quiz_id, r.student_id, count(*), sum(r.score), max(r.score),
+           (array_agg(r.score order by r.submitted_at desc))[1],
+           (array_agg(r.id order by r.submitted_at desc))[1],
+           max(r.submitted_at)
+    from exam_results r
+    join quizzes q on q.id = r.quiz_id
+    where p_course_id is null or q.course_id = p_course_id
+    group by q.course_id, r.quiz_id, r.student_id;
+    get diagnostics v_cells = row_count;
+
+    insert into gradebook_totals (course_id, student_id, quizzes_taken, attempts, score_sum, best_total, latest_total)
+    select course_id, student_id, count(*), sum(attempts), sum(score_sum), sum(best_score), sum(latest_score)
+    from gradebook_cells
+    where p_course_id is null or course_id = p_course_id
+    group by course_id, student_id;
+
+    return v_cells;
+end;
+$$;
+
+select rebuild_gradebook();
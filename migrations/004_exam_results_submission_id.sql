@@ -0,0 +1,7 @@
+-- Idempotency key for exam results. The buffered submission drainer
+-- (submission_queue.py) upserts on it, so a batch replayed after a crash
+-- never creates duplicate results.
+
+alter table exam_results add column if not exists submission_id uuid;
+
+create unique index if not exists exam_results_submission_id_key on exam_results (submission_id);
@@ -0,0 +1,69 @@
+-- Per-student daily XP counters, kept in a 32-slot ring per student.
+--
+-- Slot = UTC day number mod 32. Awarding XP adds to today's slot, or
+-- resets it first when it still holds a day from a previous lap. A student
+-- therefore never has more than 32 rows, and rolling 7/30-day totals,
+-- streaks and the weekly leaderboard read those instead of xp_transactions.
+-- Maintained by services/xp.py.
+
+create table if not exists xp_daily_buckets (
+    student_id uuid not null references users(id) on delete cascade,
+    slot smallint not null check (slot between 0 and 31),
+    day date not null,
+    xp integer not null default 0,
+    primary key (student_id, slot)
+);
+
+create index if not exists xp_daily_buckets_day_idx on xp_daily_buckets (day);
+
+
+create or replace function record_daily_xp(p_student_id uuid, p_xp integer)
+returns void
+language plpgsql
+as $$
+declare
+    v_today date := (now() at time zone 'utc')::date;
+begin
+    insert into xp_daily_buckets (student_id, slot, day, xp)
+    values (p_student_id, (v_today - date '2000-01-01') % 32, v_today, p_xp)
+    on conflict (student_id, slot) do update
+        set xp = case when xp_daily_buckets.day = excluded.day
+                      then xp_daily_buckets.xp + excluded.xp
+                      else excluded.xp end,
+            day = excluded.day;
+end;
+$$;
+
+
+-- Top students by XP earned since p_since, optionally only those enrolled in
+-- one course.
+create or replace function xp_leaderboard(p_since date, p_course_id uuid default null, p_limit integer default 10)
+returns json
+language sql
+stable
+as $$
+    select coalesce(json_agg(t), '[]'::json)
+    from (
+        select b.student_id, u.full_name, sum(b.xp) as xp
+        from xp_daily_buckets b
+        join users u on u.id = b.student_id
+        where b.day >= p_since
+          and (p_course_id is null
+               or exists (select 1 from enrollments e where e.course_id = p_course_id and e.student_id = b.student_id))
+        group by b.student_id, u.full_name
+        order by xp desc
+        limit p_limit
+    ) t;
+$$;
+
+
+-- Backfill the last 32 days from the transaction log.
+insert into xp_daily_buckets (student_id, slot, day, xp)
+select student_id, (day - date '2000-01-01') % 32, day, sum(xp_earned)
+from (
+    select student_id, (created_at at time zone 'utc')::date as day, xp_earned
+    from xp_transactions
+    where created_at >= (now() at time zone 'utc')::date - 31
+) t
+group by student_id, day
+on conflict (student_id, slot) do nothing;
@@ -0,0 +1,116 @@
+-- Cascade deletion of quizzes and courses, each in one transaction, plus an
+-- archive mode that moves results into cold tables as part of it. Called by
+-- services/deletion.py.
+--
+-- XP already awarded stays on users.points and xp_daily_buckets; only the
+-- quiz's transaction rows are removed (or archived).
+
+create table if not exists exam_results_archive (like exam_results including defaults);
+alter table exam_results_archive add column if not exists archived_at timestamptz not null default now();
+create index if not exists exam_results_archive_quiz_idx on exam_results_archive (quiz_id);
+
+create table if not exists xp_transactions_archive (like xp_transactions including defaults);
+alter table xp_transactions_archive add column if not exists archived_at timestamptz not null default now();
+
+
+-- Earlier versions of this migration: archiving was a separate batched call,
+-- and the cascades took no p_archive
+drop function if exists archive_quiz_results(uuid[], integer);
+drop function if exists delete_course_cascade(uuid);
+drop function if exists delete_quiz_cascade(uuid);
+
+
+-- With p_archive the quiz's exam results and XP transactions are moved to the
+-- archive tables, in the same transaction as the delete, instead of being
+-- deleted. xp_transactions.result_id comes from migration 009.
+create or replace function delete_quiz_cascade(p_quiz_id uuid, p_archive boolean default false)
+returns json
+language plpgsql
+as $$
+declare
+    v_results integer;
+    v_answers integer;
+    v_xp integer;
+    v_questions integer;
+    v_archived integer := 0;
+    v_moved integer;
+begin
+    -- Re-totals the course gradebook for the quiz's students
+    perform drop_gradebook_quiz(p_quiz_id);
+
+    if p_archive then
+        with moved as (
+            delete from exam_results where quiz_id = p_quiz_id
+            returning id, student_id, quiz_id, score, correct_count, total_questions, violation_count,
+                      answers, passed, feedback, submitted_at, submission_id
+        )
+        insert into exam_results_archive (id, student_id, quiz_id, score, correct_count, total_questions,
+                                          violation_count, answers, passed, feedback, submitted_at,
+                                          submission_id, archived_at)
+        select id, student_id, quiz_id, score, correct_count, total_questions, violation_count,
+               answers, passed, feedback, submitted_at, submission_id, now()
+        from moved;
+        get diagnostics v_moved = row_count;
+        v_archived := v_moved;
+
+        with moved as (
+            delete from xp_transactions where quiz_id = p_quiz_id
+            returning id, student_id, quiz_id, result_id, xp_earned, reason, created_at
+        )
+        insert into xp_transactions_archive (id, student_id, quiz_id, result_id, xp_earned, reason,
+                                             created_at, archived_at)
+        select id, student_id, quiz_id, result_id, xp_earned, reason, created_at, now()
+        from moved;
+        get diagnostics v_moved = row_count;
+        v_archived := v_archived + v_moved;
+    end if;
+
+    delete from student_answers where quiz_id = p_quiz_id;
+    get diagnostics v_answers = row_count;
+    delete from xp_transactions where quiz_id = p_quiz_id;
+    get diagnostics v_xp = row_count;
+    delete from exam_results where quiz_id = p_quiz_id;
+    get diagnostics v_results = row_count;
+    delete from quiz_attempt_ledger where quiz_id = p_quiz_id;
+    delete from questions where quiz_id = p_quiz_id;
+    get diagnostics v_questions = row_count;
+    delete from quizzes where id = p_quiz_id;
+
+    return json_build_object(
+        'quizzes', 1, 'questions', v_questions, 'exam_results', v_results,
+        'student_answers', v_answers, 'xp_transactions', v_xp, 'archived', v_archived
+    );
+end;
+$$;
+
+
+create or replace function delete_course_cascade(p_course_id uuid, p_archive boolean default false)
+returns json
+language plpgsql
+as $$
+declare
+    v_quiz record;
+    v_counts json;
+    v_totals jsonb := jsonb_build_object(
+        'quizzes', 0, 'questions', 0, 'exam_results', 0, 'student_answers', 0, 'xp_transactions', 0,
+        'archived', 0
+    );
+    v_enrollments integer;
+    v_key text;
+begin
+    for v_quiz in select id from quizzes where course_id = p_course_id loop
+        v_counts := delete_quiz_cascade(v_quiz.id, p_archive);
+        for v_key in select jsonb_object_keys(v_totals) loop
+            v_totals := jsonb_set(v_totals, array[v_key],
+                                  to_jsonb((v_totals ->> v_key)::integer + (v_counts ->> v_key)::integer));
+        end loop;
+    end loop;
+
+    delete from gradebook_totals where course_id = p_course_id;
+    delete from enrollments where course_id = p_course_id;
+    get diagnostics v_enrollments = row_count;
+    delete from courses where id = p_course_id;
+
+    return (v_totals || jsonb_build_object('enrollments', v_enrollments))::json;
+end;
+$$;
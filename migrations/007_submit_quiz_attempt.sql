@@ -0,0 +1,54 @@
+-- Submitting a quiz closes the attempt and saves the result in one
+-- transaction, so a failed save can't use up an attempt with no result.
+-- Used by services/submissions.py.
+
+-- Close the in-progress attempt and insert its exam result. Returns the new
+-- result id, or null if that attempt is not the one in progress (already
+-- submitted, reposted, expired and auto-submitted, or never started).
+create or replace function submit_quiz_attempt(p_student_id uuid, p_quiz_id uuid, p_attempt_id uuid, p_result jsonb)
+returns uuid
+language plpgsql
+as $$
+declare
+    v_result exam_results;
+    v_id uuid;
+begin
+    if not finish_quiz_attempt(p_student_id, p_quiz_id, p_attempt_id,
+                               coalesce((p_result ->> 'violation_count')::integer, 0)) then
+        return null;
+    end if;
+
+    v_result := jsonb_populate_record(null::exam_results, p_result);
+    insert into exam_results (student_id, quiz_id, score, correct_count, total_questions, violation_count,
+                              answers, passed, submitted_at, submission_id)
+    values (p_student_id, p_quiz_id, v_result.score, v_result.correct_count, v_result.total_questions,
+            v_result.violation_count, v_result.answers, v_result.passed, now(), p_attempt_id)
+    returning id into v_id;
+
+    return v_id;
+end;
+$$;
+
+
+-- Undo finish_quiz_attempt when the submission could not be queued, so the
+-- student can submit again. No-op if another attempt has been opened since.
+create or replace function reopen_quiz_attempt(p_student_id uuid, p_quiz_id uuid, p_attempt_id uuid, p_started_at timestamptz)
+returns boolean
+language plpgsql
+as $$
+begin
+    update quiz_attempt_ledger
+    set attempts_used = greatest(attempts_used - 1, 0),
+        flagged = exists (
+            select 1 from exam_results
+            where student_id = p_student_id and quiz_id = p_quiz_id and coalesce(violation_count, 0) > 0
+        ),
+        in_progress_id = p_attempt_id,
+        started_at = p_started_at
+    where student_id = p_student_id
+      and quiz_id = p_quiz_id
+      and in_progress_id is null;
+
+    return found;
+end;
+$$;
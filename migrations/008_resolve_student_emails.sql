@@ -0,0 +1,15 @@
+-- Case-insensitive email lookup for roster imports (services/enrollment.py).
+-- Called over POST, so the list isn't limited by the request URL length.
+
+create index if not exists users_email_lower_idx on users (lower(email));
+
+create or replace function resolve_student_emails(p_emails text[])
+returns table (id uuid, email text)
+language sql
+stable
+as $$
+    select u.id, lower(u.email)
+    from users u
+    where lower(u.email) = any(select lower(e) from unnest(p_emails) e)
+      and u.role = 'student';
+$$;
@@ -0,0 +1,8 @@
+-- One XP award per exam result, so replaying a submission's follow-up work
+-- (submission_queue.py) can't award it twice. Used by services/xp.py.
+
+alter table xp_transactions add column if not exists result_id uuid;
+create unique index if not exists xp_transactions_result_id_key on xp_transactions (result_id);
+
+-- Keep the archive (migrations/006_cascade_delete.sql) in step
+alter table if exists xp_transactions_archive add column if not exists result_id uuid;
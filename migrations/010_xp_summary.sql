@@ -0,0 +1,28 @@
+-- A student's daily XP buckets and latest XP transactions in one round
+-- trip, for the dashboard summary (services/xp.py xp_summary).
+
+create index if not exists xp_transactions_student_created_idx on xp_transactions (student_id, created_at desc);
+
+create or replace function xp_summary(p_student_id uuid, p_recent integer default 5)
+returns json
+language sql
+stable
+as $$
+    select json_build_object(
+        'buckets', coalesce((
+            select json_agg(json_build_object('day', b.day, 'xp', b.xp))
+            from xp_daily_buckets b
+            where b.student_id = p_student_id
+        ), '[]'::json),
+        'recent', coalesce((
+            select json_agg(t)
+            from (
+                select xp_earned, reason, created_at
+                from xp_transactions
+                where student_id = p_student_id
+                order by created_at desc
+                limit p_recent
+            ) t
+        ), '[]'::json)
+    );
+$$;
@@ -0,0 +1,14 @@
+-- The activity feed's default "realtime" source (activity_feed.py) listens
+-- for exam_results inserts, which Supabase only broadcasts for tables in the
+-- supabase_realtime publication.
+
+do $$
+begin
+    if not exists (
+        select 1 from pg_publication_tables
+        where pubname = 'supabase_realtime' and schemaname = 'public' and tablename = 'exam_results'
+    ) then
+        alter publication supabase_realtime add table exam_results;
+    end if;
+end;
+$$;
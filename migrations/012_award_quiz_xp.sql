@@ -0,0 +1,39 @@
+-- Award a result's XP in one transaction: the log row, the student's points,
+-- level and badge, and today's bucket (migrations/005) commit together or
+-- not at all. The log row is unique per result (migrations/009), so a
+-- replayed award does nothing. Used by services/xp.py.
+
+create or replace function award_quiz_xp(p_student_id uuid, p_quiz_id uuid, p_result_id uuid,
+                                         p_xp integer, p_reason text)
+returns boolean
+language plpgsql
+as $$
+declare
+    v_points integer;
+    v_level record;
+begin
+    insert into xp_transactions (student_id, quiz_id, result_id, xp_earned, reason, created_at)
+    values (p_student_id, p_quiz_id, p_result_id, p_xp, p_reason, now())
+    on conflict (result_id) do nothing;
+    if not found then
+        return false;
+    end if;
+
+    update users set points = coalesce(points, 0) + p_xp
+    where id = p_student_id
+    returning points into v_points;
+
+    select level, badge_name into v_level
+    from levels
+    where xp_required <= v_points
+    order by level desc
+    limit 1;
+    if found then
+        update users set level = v_level.level, current_badge = v_level.badge_name
+        where id = p_student_id;
+    end if;
+
+    perform record_daily_xp(p_student_id, p_xp);
+    return true;
+end;
+$$;
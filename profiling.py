@@ -0,0 +1,147 @@
+import hmac
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from flask import g, request
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ARG = "_profile"
+
+# Innermost matching frame decides where a sample's time went
+PHASES = (
+    ("decode", ("/json/", "/pydantic/", "/pydantic_core/")),
+    ("backend", ("/httpx/", "/httpcore/", "/h2/", "/postgrest/", "/supabase_auth/", "ssl.py", "socket.py")),
+    ("render", ("/jinja2/",)),
+)
+
+
+class Sampler(threading.Thread):
+    """Samples one thread's Python stack every ``interval`` seconds.
+
+    A sampler rather than cProfile: it keeps whole stacks (for flame graphs)
+    and costs the profiled request little beyond the GIL switches.
+    """
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.phases = Counter()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            phase = None
+            while frame is not None:
+                filename = frame.f_code.co_filename
+                if phase is None:
+                    phase = _phase(filename)
+                stack.append(f"{os.path.basename(filename)}:{frame.f_code.co_name}")
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks[";".join(stack)] += 1
+            self.phases[phase or "compute"] += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+def _phase(filename):
+    filename = filename.replace("\\", "/")
+    for phase, markers in PHASES:
+        if any(marker in filename for marker in markers):
+            return phase
+    return None
+
+
+def init_app(app):
+    """Profile requests on demand; registers nothing at all while switched off.
+
+    A request is profiled when it carries ``X-Profile: <PROFILE_TOKEN>`` (or
+    ``?_profile=<PROFILE_TOKEN>``), or when it is picked by 1-in-
+    ``PROFILE_SAMPLE_RATE`` sampling. Each profile writes two files to
+    ``PROFILE_DIR``: ``<id>.collapsed`` (folded stacks, for flamegraph.pl or
+    speedscope) and ``<id>.json`` (timing and the phase breakdown).
+    """
+    token = app.config["PROFILE_TOKEN"]
+    sample_rate = app.config["PROFILE_SAMPLE_RATE"]
+    if not token and not sample_rate:
+        return
+
+    counter = itertools.count(1)
+
+    @app.before_request
+    def start_profile():
+        requested = request.headers.get(PROFILE_HEADER) or request.args.get(PROFILE_ARG)
+        if requested:
+            if not (token and hmac.compare_digest(requested, token)):
+                return
+        elif not (sample_rate and next(counter) % sample_rate == 0):
+            return
+
+        sampler = Sampler(threading.get_ident(), app.config["PROFILE_INTERVAL"])
+        g.profile = (sampler, time.perf_counter())
+        sampler.start()
+
+    @app.after_request
+    def finish_profile(response):
+        profile_id = _finish(app, response.status_code)
+        if profile_id:
+            response.headers["X-Profile-Id"] = profile_id
+        return response
+
+    @app.teardown_request
+    def abandon_profile(exc):
+        # Only still running if the view raised
+        _finish(app, 500)
+
+
+def _finish(app, status):
+    profile = g.pop("profile", None)
+    if profile is None:
+        return None
+    sampler, started = profile
+    sampler.stop()
+    wall = time.perf_counter() - started
+
+    profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{(request.endpoint or 'unknown').replace('.', '_')}-{uuid.uuid4().hex[:6]}"
+    total = sum(sampler.phases.values())
+    # Never write the token itself to disk
+    args = "&".join(f"{k}={v}" for k, v in request.args.items(multi=True) if k != PROFILE_ARG)
+    summary = {
+        "method": request.method,
+        "path": f"{request.path}?{args}" if args else request.path,
+        "endpoint": request.endpoint,
+        "status": status,
+        "wall_ms": round(wall * 1000, 1),
+        "samples": total,
+        "interval_ms": app.config["PROFILE_INTERVAL"] * 1000,
+        # Wall time split by the share of samples seen in each phase
+        "phases_ms": {phase: round(wall * 1000 * sampler.phases[phase] / total, 1) if total else 0
+                      for phase in ("backend", "decode", "compute", "render")},
+    }
+
+    try:
+        directory = app.config["PROFILE_DIR"]
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"{profile_id}.collapsed"), "w") as f:
+            for stack, count in sampler.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        with open(os.path.join(directory, f"{profile_id}.json"), "w") as f:
+            json.dump(summary, f, indent=2)
+    except OSError as e:
+        print(f"Error writing profile: {str(e)}")
+        return None
+    return profile_id
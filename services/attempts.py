@@ -0,0 +1,94 @@
+import datetime
+
+from backend import supabase
+
+EMPTY_LEDGER = {"attempts_used": 0, "flagged": False, "in_progress_id": None, "started_at": None}
+
+# Past the deadline, a submit may still be on its way; after this long the
+# attempt counts as abandoned and is auto-submitted
+EXPIRY_GRACE_SECONDS = 120
+
+
+class AttemptNotAllowed(Exception):
+    pass
+
+
+def get_ledger(student_id, quiz_id):
+    """The student's attempt state for one quiz (primary-key lookup)."""
+    rows = supabase.table("quiz_attempt_ledger")\
+        .select("attempts_used, flagged, in_progress_id, started_at")\
+        .eq("student_id", student_id)\
+        .eq("quiz_id", quiz_id)\
+        .limit(1)\
+        .execute().data
+    return rows[0] if rows else dict(EMPTY_LEDGER)
+
+
+def check_eligibility(ledger, quiz):
+    """Return ``(can_take, message)`` for a ledger row and its quiz."""
+    max_attempts = int(quiz.get('max_attempts') or 1)
+
+    if ledger['in_progress_id']:
+        return True, ""
+    if ledger['flagged']:
+        return False, "You are blocked from retaking this quiz due to suspicious activity in a previous attempt."
+    if ledger['attempts_used'] >= max_attempts:
+        return False, f"You have used all {max_attempts} attempts allowed for this quiz."
+    return True, ""
+
+
+def start_attempt(student_id, quiz):
+    """Open (or resume) an attempt. Raises AttemptNotAllowed if none is left."""
+    ledger = supabase.rpc("start_quiz_attempt", {
+        "p_student_id": student_id,
+        "p_quiz_id": quiz['id'],
+        "p_max_attempts": int(quiz.get('max_attempts') or 1),
+    }).execute().data
+
+    if not ledger or not ledger.get('in_progress_id'):
+        _, message = check_eligibility(ledger or EMPTY_LEDGER, quiz)
+        raise AttemptNotAllowed(message or "This quiz cannot be started right now.")
+    return ledger
+
+
+def finish_attempt(student_id, quiz_id, attempt_id, violation_count):
+    """Close the in-progress attempt. False if it was already submitted or never started."""
+    if not attempt_id:
+        return False
+    return bool(supabase.rpc("finish_quiz_attempt", {
+        "p_student_id": student_id,
+        "p_quiz_id": quiz_id,
+        "p_attempt_id": attempt_id,
+        "p_violation_count": violation_count,
+    }).execute().data)
+
+
+def reopen_attempt(student_id, quiz_id, attempt_id, started_at):
+    """Undo ``finish_attempt`` when the submission couldn't be saved, so the student can resubmit."""
+    return bool(supabase.rpc("reopen_quiz_attempt", {
+        "p_student_id": student_id,
+        "p_quiz_id": quiz_id,
+        "p_attempt_id": attempt_id,
+        "p_started_at": started_at,
+    }).execute().data)
+
+
+def _elapsed(ledger):
+    started_at = datetime.datetime.fromisoformat(ledger['started_at'].replace('Z', '+00:00'))
+    return (datetime.datetime.now(datetime.timezone.utc) - started_at).total_seconds()
+
+
+def seconds_left(ledger, quiz):
+    """Time remaining on the in-progress attempt, so a reload doesn't restart the clock."""
+    duration = int(quiz.get('duration_minutes') or 0) * 60
+    if not ledger.get('started_at'):
+        return duration
+    return max(int(duration - _elapsed(ledger)), 0)
+
+
+def is_expired(ledger, quiz):
+    """True for an in-progress attempt past its deadline and the grace period."""
+    duration = int(quiz.get('duration_minutes') or 0) * 60
+    if not ledger.get('in_progress_id') or not ledger.get('started_at') or not duration:
+        return False
+    return _elapsed(ledger) > duration + EXPIRY_GRACE_SECONDS
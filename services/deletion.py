@@ -0,0 +1,25 @@
+from backend import supabase
+from services import membership, roster
+
+# The cascade functions live in migrations/006_cascade_delete.sql. XP already
+# awarded stays on the students.
+
+
+def delete_quiz(quiz_id, archive=False):
+    """Delete a quiz with its questions, results, answers, attempts and XP log.
+
+    One transaction on the server. With ``archive`` the results and XP log
+    are moved to the archive tables in that transaction instead of being
+    deleted. Returns row counts per table, plus ``archived``.
+    """
+    counts = supabase.rpc("delete_quiz_cascade", {"p_quiz_id": quiz_id, "p_archive": archive}).execute().data
+    membership.forget_quiz(quiz_id)
+    return counts
+
+
+def delete_course(course_id, archive=False):
+    """Delete a course, every quiz in it (as ``delete_quiz``) and its enrollments."""
+    counts = supabase.rpc("delete_course_cascade", {"p_course_id": course_id, "p_archive": archive}).execute().data
+    membership.forget_course(course_id)
+    roster.invalidate(course_id)
+    return counts
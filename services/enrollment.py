@@ -0,0 +1,95 @@
+import csv
+from io import StringIO
+
+import fetching
+from backend import supabase
+from services import membership, roster
+
+INSERT_CHUNK_SIZE = 500
+ID_COLUMNS = {"email", "student_id"}
+
+
+def parse_roster(text):
+    """Read a roster CSV into ``(emails, school_ids)``, both de-duplicated, in file order.
+
+    A header row naming an ``email`` and/or ``student_id`` column is used if
+    present. Otherwise the first non-empty cell of each row is taken, and
+    anything containing ``@`` is treated as an email.
+    """
+    rows = [row for row in csv.reader(StringIO(text)) if any(cell.strip() for cell in row)]
+    emails, school_ids = {}, {}
+    if not rows:
+        return [], []
+
+    header = [cell.strip().lower() for cell in rows[0]]
+    if ID_COLUMNS & set(header):
+        email_col = header.index("email") if "email" in header else None
+        id_col = header.index("student_id") if "student_id" in header else None
+        for row in rows[1:]:
+            email = row[email_col].strip().lower() if email_col is not None and email_col < len(row) else ""
+            school_id = row[id_col].strip() if id_col is not None and id_col < len(row) else ""
+            if email:
+                emails[email] = None
+            elif school_id:
+                school_ids[school_id] = None
+        return list(emails), list(school_ids)
+
+    for row in rows:
+        value = next(cell.strip() for cell in row if cell.strip())
+        if "@" in value:
+            emails[value.lower()] = None
+        else:
+            school_ids[value] = None
+    return list(emails), list(school_ids)
+
+
+def resolve_students(emails, school_ids):
+    """Map roster identifiers to user ids. Returns ``(user_ids, unknown_identifiers)``."""
+    found = {}
+    # Stored emails may be mixed case, so they're matched in the database (migrations/008).
+    # The function returns a set, so the row cap applies: page it like a table read
+    if emails:
+        for u in fetching.fetch_all(lambda: supabase.rpc("resolve_student_emails", {"p_emails": emails}).order("id")):
+            found[u['email']] = u['id']
+    # Rosters can run to thousands of rows; fetch_in keeps each request URL short
+    for p in fetching.iter_in(lambda: supabase.table("student_profiles").select("user_id, student_id"), "student_id", school_ids,
+                              tiebreaker="user_id"):
+        found[p['student_id']] = p['user_id']
+
+    unknown = [i for i in emails + school_ids if i not in found]
+    # Dict keeps file order while dropping students listed twice (by email and by id)
+    user_ids = list(dict.fromkeys(found[i] for i in emails + school_ids if i in found))
+    return user_ids, unknown
+
+
+def import_roster(course_id, text):
+    """Enroll every student listed in a roster CSV that isn't enrolled yet.
+
+    Returns counts of ``enrolled``, ``skipped`` (already in the course) and
+    ``unknown`` identifiers, plus the unknown identifiers themselves.
+    """
+    emails, school_ids = parse_roster(text)
+    user_ids, unknown = resolve_students(emails, school_ids)
+
+    # Students already enrolled are skipped by the database, so a large course
+    # (or a concurrent join) can't fail a chunk after earlier ones committed
+    new_ids = []
+    for start in range(0, len(user_ids), INSERT_CHUNK_SIZE):
+        chunk = user_ids[start:start + INSERT_CHUNK_SIZE]
+        inserted = supabase.table("enrollments")\
+            .upsert([{"student_id": uid, "course_id": course_id} for uid in chunk],
+                    on_conflict="student_id,course_id", ignore_duplicates=True)\
+            .execute().data
+        inserted_ids = [e['student_id'] for e in inserted]
+        membership.enroll(course_id, inserted_ids)
+        new_ids.extend(inserted_ids)
+
+    if new_ids:
+        roster.invalidate(course_id)
+
+    return {
+        "enrolled": len(new_ids),
+        "skipped": len(user_ids) - len(new_ids),
+        "unknown": len(unknown),
+        "unknown_identifiers": unknown,
+    }
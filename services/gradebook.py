@@ -0,0 +1,52 @@
+import fetching
+from backend import supabase
+
+# gradebook_cells / gradebook_totals are maintained by the database functions
+# in migrations/003_gradebook.sql. Every write that changes a score must go
+# through one of the record_* helpers below or the gradebook goes stale
+# (rebuild() fixes it).
+
+
+def record_result(student_id, quiz_id):
+    """Refresh one (student, quiz) cell after a submission or regrade."""
+    try:
+        supabase.rpc("refresh_gradebook_cell", {"p_student_id": student_id, "p_quiz_id": quiz_id}).execute()
+    except Exception as e:
+        # The result itself is saved; `flask rebuild-gradebook` repairs the cell
+        print(f"Error updating gradebook: {str(e)}")
+
+
+def remove_quiz(quiz_id):
+    """Drop a quiz's column and re-total its students. Call before deleting the quiz."""
+    supabase.rpc("drop_gradebook_quiz", {"p_quiz_id": quiz_id}).execute()
+
+
+def rebuild(course_id=None):
+    """Recompute the gradebook from exam_results for one course, or all. Returns cell count."""
+    return supabase.rpc("rebuild_gradebook", {"p_course_id": course_id}).execute().data
+
+
+def course_cells(course_id):
+    """Latest/best score per (student, quiz) in a course."""
+    return fetching.fetch_all(lambda: supabase.table("gradebook_cells")
+                              .select("student_id, quiz_id, attempts, best_score, latest_score")
+                              .eq("course_id", course_id)
+                              .order("student_id").order("quiz_id"))
+
+
+def course_totals(course_id):
+    """Per-student totals for a course, keyed by student id."""
+    rows = fetching.fetch_all(lambda: supabase.table("gradebook_totals")
+                              .select("student_id, quizzes_taken, attempts, score_sum, best_total, latest_total")
+                              .eq("course_id", course_id)
+                              .order("student_id"))
+    return {row['student_id']: row for row in rows}
+
+
+def quiz_cells(quiz_id):
+    """Per-student summary of one quiz, best score first."""
+    return fetching.fetch_all(lambda: supabase.table("gradebook_cells")
+                              .select("student_id, attempts, best_score, latest_score, latest_submitted_at, "
+                                      "users(full_name, email)")
+                              .eq("quiz_id", quiz_id)
+                              .order("best_score", desc=True).order("student_id"))
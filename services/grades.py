@@ -0,0 +1,54 @@
+from backend import supabase
+
+DEFAULT_TARGET_CA = 40
+ATTEMPTS_PAGE_SIZE = 20
+
+
+def ca_projection(score_total, quiz_count, target_ca=DEFAULT_TARGET_CA):
+    """Average % across all of a course's quizzes (unattempted count as 0) and the CA mark it gives.
+
+    This is the gradebook export formula; keep the two in step.
+    """
+    avg = round(score_total / quiz_count) if quiz_count > 0 else 0
+    final_ca = round((avg / 100) * target_ca)
+    return avg, final_ca
+
+
+def course_summaries(student_id, target_ca=DEFAULT_TARGET_CA):
+    """One summary row per course the student is enrolled in or has results for.
+
+    Aggregation happens in the ``student_grade_summaries`` database function
+    (migrations/001_student_grade_summaries.sql), so this is a single
+    round-trip however many attempts the student has made.
+    """
+    summaries = supabase.rpc("student_grade_summaries", {"p_student_id": student_id}).execute().data or []
+    for s in summaries:
+        s['ca_average'], s['ca_projection'] = ca_projection(s['latest_score_total'], s['quiz_count'], target_ca)
+    return summaries
+
+
+def overall_stats(summaries):
+    """Totals for the stat cards at the top of the grades page."""
+    attempts = sum(s['attempts'] for s in summaries)
+    score_total = sum(s['score_total'] for s in summaries)
+    return {
+        "attempts": attempts,
+        "average": round(score_total / attempts, 1) if attempts > 0 else 0,
+        "with_feedback": sum(s['feedback_count'] for s in summaries),
+    }
+
+
+def course_attempts(student_id, course_id, offset=0, limit=ATTEMPTS_PAGE_SIZE):
+    """A page of the student's attempts in one course, newest first.
+
+    Returns ``(attempts, has_more)``.
+    """
+    rows = supabase.table("exam_results")\
+        .select("id, score, feedback, submitted_at, quizzes!inner(title, course_id)")\
+        .eq("student_id", student_id)\
+        .eq("quizzes.course_id", course_id)\
+        .order("submitted_at", desc=True)\
+        .range(offset, offset + limit)\
+        .execute().data
+    # One extra row was requested to tell whether another page exists
+    return rows[:limit], len(rows) > limit
@@ -0,0 +1,92 @@
+def grade(questions, answers):
+    """Mark a submission. Returns ``(correct_count, total_questions, score_percent)``."""
+    correct_count = 0
+    total_questions = len(questions)
+
+    for q in questions:
+        q_id = str(q['id'])
+        user_ans = answers.get(q_id)
+        
+        # Get correct answer based on question type
+        correct_ans = q.get('correct_option', '')
+        
+        if q.get('question_type') == 'MCQ':
+            if user_ans and str(user_ans).strip().upper() == str(correct_ans).strip().upper():
+                correct_count += 1
+                
+        elif q.get('question_type') == 'FILL_BLANK':
+            if user_ans and str(user_ans).strip().lower() == str(correct_ans).strip().lower():
+                correct_count += 1
+                
+        elif q.get('question_type') == 'THEORY':
+            keywords = [k.strip().lower() for k in q.get('keywords', '').split(',') if k.strip()]
+            user_text = str(user_ans).lower() if user_ans else ''
+            if any(keyword in user_text for keyword in keywords):
+                correct_count += 1
+
+    final_score_percent = int((correct_count / total_questions * 100)) if total_questions > 0 else 0
+    return correct_count, total_questions, final_score_percent
+
+
+def build_report(questions, answers):
+    """Question-by-question breakdown shown on the result page."""
+    report = []
+    for q in questions:
+        q_id = str(q['id'])
+        user_answer = answers.get(q_id, 'Not Answered')
+
+        # Determine correctness
+        is_correct = False
+        correct_answer = ''
+
+        if q['question_type'] == 'MCQ':
+            option_map = {
+                'A': q.get('option_a'),
+                'B': q.get('option_b'),
+                'C': q.get('option_c'),
+                'D': q.get('option_d')
+            }
+            correct_code = q.get('correct_option', '').upper()
+            correct_answer = option_map.get(correct_code, 'Unknown')
+            is_correct = (user_answer.upper() == correct_code)
+
+        elif q['question_type'] == 'FILL_BLANK':
+            correct_answer = q.get('correct_option', '')
+            is_correct = (str(user_answer).strip().lower() == str(correct_answer).strip().lower())
+
+        elif q['question_type'] == 'THEORY':
+            keywords = [k.strip().lower() for k in q.get('keywords', '').split(',') if k.strip()]
+            user_text = str(user_answer).lower()
+            correct_answer = f"Keywords: {q.get('keywords', 'None')}"
+            is_correct = any(keyword in user_text for keyword in keywords) if keywords else False
+
+        report.append({
+            'question': q.get('question_text', 'Question not found'),
+            'user_answer': user_answer,
+            'correct_answer': correct_answer,
+            'is_correct': is_correct
+        })
+    return report
+
+
+def student_questions(questions):
+    """Questions as shown to a student taking the quiz: no answer keys."""
+    formatted = []
+    for q in questions:
+        formatted_q = {
+            'id': str(q['id']),  # Convert to string for JavaScript
+            'text': q.get('question_text', 'Question text not found'),
+            'question_type': q.get('question_type', 'MCQ'),
+            'options': []
+        }
+
+        if formatted_q['question_type'] == 'MCQ':
+            formatted_q['options'] = [
+                {'code': 'A', 'text': q.get('option_a', 'Option A')},
+                {'code': 'B', 'text': q.get('option_b', 'Option B')},
+                {'code': 'C', 'text': q.get('option_c', 'Option C')},
+                {'code': 'D', 'text': q.get('option_d', 'Option D')}
+            ]
+
+        formatted.append(formatted_q)
+    return formatted
@@ -0,0 +1,251 @@
+import threading
+import time
+
+from flask import current_app
+from pyroaring import BitMap
+
+import fetching
+from backend import supabase
+
+
+class MembershipIndex:
+    """Per-worker roaring-bitmap index of who is enrolled in, and has attempted, what.
+
+    Student uuids are mapped to small integers so that each course's roster and
+    each quiz's attempted/passed/flagged sets are a ``BitMap``; set questions
+    ("enrolled but not attempted", "attempted every quiz", "in both courses")
+    are then bitmap operations instead of list filtering.
+
+    Courses are loaded from the backend on first use and reloaded after
+    ``ttl`` seconds. Writes handled by other workers are picked up sooner:
+    at most every ``revalidate`` seconds the course's enrollment, quiz and
+    result counts are read (three count-only queries) and a change triggers
+    a reload. A drop and a join that cancel out go unnoticed until the ttl.
+    """
+
+    def __init__(self, ttl=300, revalidate=10):
+        self.ttl = ttl
+        self.revalidate = revalidate
+        self._ids = {}
+        self._uuids = []
+        self._enrolled = {}
+        self._quizzes = {}
+        self._course_quizzes = {}
+        self._loaded_at = {}
+        self._checked_at = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    # --- id mapping ---
+
+    def _intern(self, student_id):
+        n = self._ids.get(student_id)
+        if n is None:
+            n = self._ids[student_id] = len(self._uuids)
+            self._uuids.append(student_id)
+        return n
+
+    def to_uuids(self, bitmap):
+        return [self._uuids[n] for n in bitmap]
+
+    # --- loading ---
+
+    def _course(self, course_id):
+        now = time.monotonic()
+        loaded_at = self._loaded_at.get(course_id)
+        if loaded_at is None or now - loaded_at > self.ttl:
+            self._load(course_id)
+        elif now - self._checked_at.get(course_id, loaded_at) > self.revalidate:
+            self._checked_at[course_id] = now
+            if _course_counts(course_id) != self._counts.get(course_id):
+                self._load(course_id)
+
+    def _load(self, course_id):
+        enrolled = fetching.fetch_all(lambda: supabase.table("enrollments").select("student_id").eq("course_id", course_id)
+                             .order("student_id"))
+        quiz_ids = [q['id'] for q in supabase.table("quizzes").select("id").eq("course_id", course_id).execute().data]
+        results = fetching.fetch_all(lambda: supabase.table("exam_results")
+                             .select("student_id, quiz_id, passed, violation_count, quizzes!inner(course_id)")
+                             .eq("quizzes.course_id", course_id)
+                             .order("id"))
+
+        with self._lock:
+            self._enrolled[course_id] = BitMap(self._intern(e['student_id']) for e in enrolled)
+            quizzes = {quiz_id: _quiz_sets() for quiz_id in quiz_ids}
+            for r in results:
+                sets = quizzes.setdefault(r['quiz_id'], _quiz_sets())
+                _add_attempt(sets, self._intern(r['student_id']), r.get('passed'), r.get('violation_count'))
+            self._quizzes.update(quizzes)
+            self._course_quizzes[course_id] = set(quizzes)
+            self._loaded_at[course_id] = self._checked_at[course_id] = time.monotonic()
+            self._counts[course_id] = (len(enrolled), len(quiz_ids), len(results))
+
+    def _load_quiz(self, course_id, quiz_id):
+        # A quiz created since the course was loaded (possibly by another worker)
+        results = fetching.fetch_all(lambda: supabase.table("exam_results")
+                             .select("student_id, passed, violation_count")
+                             .eq("quiz_id", quiz_id)
+                             .order("id"))
+        with self._lock:
+            sets = _quiz_sets()
+            for r in results:
+                _add_attempt(sets, self._intern(r['student_id']), r.get('passed'), r.get('violation_count'))
+            self._quizzes[quiz_id] = sets
+            self._course_quizzes.setdefault(course_id, set()).add(quiz_id)
+        return sets
+
+    # --- updates ---
+
+    def enroll(self, course_id, student_ids):
+        with self._lock:
+            if course_id in self._enrolled:
+                self._enrolled[course_id].update(self._intern(s) for s in student_ids)
+
+    def unenroll(self, course_id, student_id):
+        with self._lock:
+            if course_id in self._enrolled and student_id in self._ids:
+                self._enrolled[course_id].discard(self._ids[student_id])
+
+    def record_attempt(self, student_id, quiz_id, passed, violation_count):
+        with self._lock:
+            # A quiz that isn't loaded yet is picked up whole on first use
+            if quiz_id in self._quizzes:
+                _add_attempt(self._quizzes[quiz_id], self._intern(student_id), passed, violation_count)
+
+    def add_quiz(self, course_id, quiz_id):
+        with self._lock:
+            if course_id in self._course_quizzes:
+                self._quizzes.setdefault(quiz_id, _quiz_sets())
+                self._course_quizzes[course_id].add(quiz_id)
+
+    def forget_quiz(self, quiz_id):
+        with self._lock:
+            self._quizzes.pop(quiz_id, None)
+            for quiz_ids in self._course_quizzes.values():
+                quiz_ids.discard(quiz_id)
+
+    def forget_course(self, course_id):
+        with self._lock:
+            for quiz_id in self._course_quizzes.pop(course_id, ()):
+                self._quizzes.pop(quiz_id, None)
+            self._enrolled.pop(course_id, None)
+            self._loaded_at.pop(course_id, None)
+            self._checked_at.pop(course_id, None)
+            self._counts.pop(course_id, None)
+
+    # --- queries (BitMaps of interned ids) ---
+
+    def enrolled(self, course_id):
+        self._course(course_id)
+        return self._enrolled[course_id]
+
+    def quiz_set(self, course_id, quiz_id, kind="attempted"):
+        self._course(course_id)
+        sets = self._quizzes.get(quiz_id)
+        if sets is None:
+            sets = self._load_quiz(course_id, quiz_id)
+        return sets[kind]
+
+    def course_quiz_ids(self, course_id):
+        self._course(course_id)
+        return set(self._course_quizzes[course_id])
+
+
+def _course_counts(course_id):
+    """Enrollment, quiz and result counts for a course: cheap to read, and they move on every write."""
+    def count(query):
+        return query.limit(1).execute().count
+    return (
+        count(supabase.table("enrollments").select("student_id", count="exact").eq("course_id", course_id)),
+        count(supabase.table("quizzes").select("id", count="exact").eq("course_id", course_id)),
+        count(supabase.table("exam_results").select("id, quizzes!inner(course_id)", count="exact")
+              .eq("quizzes.course_id", course_id)),
+    )
+
+
+def _quiz_sets():
+    return {"attempted": BitMap(), "passed": BitMap(), "flagged": BitMap()}
+
+
+def _add_attempt(sets, n, passed, violation_count):
+    sets["attempted"].add(n)
+    if passed:
+        sets["passed"].add(n)
+    if violation_count:
+        sets["flagged"].add(n)
+
+
+def get_index():
+    index = current_app.extensions.get("membership_index")
+    if index is None:
+        index = current_app.extensions.setdefault(
+            "membership_index", MembershipIndex(current_app.config["MEMBERSHIP_INDEX_TTL"],
+                                                current_app.config["MEMBERSHIP_INDEX_REVALIDATE"])
+        )
+    return index
+
+
+# ==========================================
+# UPDATES (called after the backend write succeeds)
+# ==========================================
+
+def enroll(course_id, student_ids):
+    get_index().enroll(course_id, student_ids)
+
+
+def unenroll(course_id, student_id):
+    get_index().unenroll(course_id, student_id)
+
+
+def record_attempt(student_id, quiz_id, passed, violation_count=0):
+    get_index().record_attempt(student_id, quiz_id, passed, violation_count)
+
+
+def add_quiz(course_id, quiz_id):
+    get_index().add_quiz(course_id, quiz_id)
+
+
+def forget_quiz(quiz_id):
+    get_index().forget_quiz(quiz_id)
+
+
+def forget_course(course_id):
+    get_index().forget_course(course_id)
+
+
+# ==========================================
+# SET QUERIES (student uuids)
+# ==========================================
+
+def not_attempted(course_id, quiz_id):
+    """Enrolled students with no attempt at ``quiz_id``."""
+    index = get_index()
+    return index.to_uuids(index.enrolled(course_id) - index.quiz_set(course_id, quiz_id))
+
+
+def attempted_all(course_id, quiz_ids=None):
+    """Enrolled students who have attempted every quiz (default: every quiz in the course)."""
+    index = get_index()
+    remaining = BitMap(index.enrolled(course_id))
+    for quiz_id in (index.course_quiz_ids(course_id) if quiz_ids is None else quiz_ids):
+        remaining &= index.quiz_set(course_id, quiz_id)
+    return index.to_uuids(remaining)
+
+
+def shared_students(course_a, course_b):
+    """Students enrolled in both courses."""
+    index = get_index()
+    return index.to_uuids(index.enrolled(course_a) & index.enrolled(course_b))
+
+
+def quiz_students(course_id, quiz_id, kind="attempted"):
+    """Students who ``attempted``, ``passed`` or were ``flagged`` (any violation) on a quiz."""
+    index = get_index()
+    return index.to_uuids(index.quiz_set(course_id, quiz_id, kind))
+
+
+def missing_submissions(course_id, quiz_ids):
+    """``{quiz_id: [student uuids]}`` of enrolled students yet to attempt each quiz."""
+    index = get_index()
+    enrolled = index.enrolled(course_id)
+    return {quiz_id: index.to_uuids(enrolled - index.quiz_set(course_id, quiz_id)) for quiz_id in quiz_ids}
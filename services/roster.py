@@ -0,0 +1,91 @@
+import threading
+import time
+
+from flask import current_app
+
+import fetching
+from backend import supabase
+
+NO_SCHOOL_ID = "N/A"
+
+
+class RosterEntry:
+    """One enrolled student. Slotted: large courses hold thousands of these per worker."""
+
+    __slots__ = ("student_id", "name", "email", "school_id")
+
+    def __init__(self, student_id, name, email, school_id):
+        self.student_id = student_id
+        self.name = name
+        self.email = email
+        self.school_id = school_id
+
+    def __repr__(self):
+        return f"RosterEntry({self.student_id!r}, {self.name!r})"
+
+
+class CourseRoster:
+    """Per-worker cache of each course's enriched roster.
+
+    Entries are dropped on join/drop/import in this worker and expire after
+    ``ttl`` seconds, which bounds staleness from writes handled elsewhere.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._rosters = {}
+        self._lock = threading.Lock()
+
+    def get(self, course_id):
+        cached = self._rosters.get(course_id)
+        if cached is not None and time.monotonic() - cached[0] <= self.ttl:
+            return cached[1]
+
+        entries = load(course_id)
+        with self._lock:
+            self._rosters[course_id] = (time.monotonic(), entries)
+        return entries
+
+    def invalidate(self, course_id):
+        with self._lock:
+            self._rosters.pop(course_id, None)
+
+
+def _school_id(user):
+    # One-to-one embeds come back as an object, otherwise as a list
+    profile = user.get('student_profiles')
+    if isinstance(profile, list):
+        profile = profile[0] if profile else None
+    return (profile or {}).get('student_id') or NO_SCHOOL_ID
+
+
+def load(course_id):
+    """Enrolled students with name, email and school id in one query, sorted by name."""
+    rows = fetching.fetch_all(lambda: supabase.table("enrollments")
+                              .select("student_id, users(full_name, email, student_profiles(student_id))")
+                              .eq("course_id", course_id)
+                              .order("student_id"))
+
+    entries = []
+    for row in rows:
+        user = row.get('users') or {}
+        entries.append(RosterEntry(row['student_id'], user.get('full_name') or "Unknown", user.get('email') or "", _school_id(user)))
+    entries.sort(key=lambda e: e.name.lower())
+    return tuple(entries)
+
+
+def get_cache():
+    cache = current_app.extensions.get("course_rosters")
+    if cache is None:
+        cache = current_app.extensions.setdefault("course_rosters", CourseRoster(current_app.config["ROSTER_CACHE_TTL"]))
+    return cache
+
+
+def course_roster(course_id):
+    """The course's roster as a tuple of ``RosterEntry``, cached."""
+    return get_cache().get(course_id)
+
+
+def invalidate(course_id):
+    """Call after enrollments for the course change."""
+    get_cache().invalidate(course_id)
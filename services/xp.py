@@ -0,0 +1,98 @@
+import datetime
+
+from backend import supabase
+
+# Ring size of xp_daily_buckets (migrations/005_xp_daily_buckets.sql)
+BUCKET_DAYS = 32
+
+
+def award_student_xp(user_id, score, quiz_id, result_id):
+    """Award XP to student based on quiz performance, once per result.
+
+    Raises if the award fails, so the submission queue's follow-up is
+    retried; nothing is applied unless all of it is.
+    """
+    # Get quiz difficulty (could be based on number of questions or course level)
+    quiz_data = supabase.table("quizzes").select("course_id").eq("id", quiz_id).single().execute()
+    course_data = supabase.table("courses").select("category").eq("id", quiz_data.data['course_id']).single().execute()
+    
+    # Determine difficulty multiplier
+    difficulty_map = {
+        "Advanced": 3,
+        "Intermediate": 2,
+        "Computer Science": 2,
+        "Mathematics": 2,
+        "Engineering": 2,
+        "Business": 1,
+        "General": 1
+    }
+    
+    difficulty = difficulty_map.get(course_data.data.get('category', 'General'), 1)
+    
+    # Calculate XP earned
+    base_xp = score  # 1 XP per percentage point
+    
+    # Bonus for high scores
+    if score >= 90:
+        bonus = 50
+    elif score >= 80:
+        bonus = 30
+    elif score >= 70:
+        bonus = 20
+    elif score >= 60:
+        bonus = 10
+    else:
+        bonus = 5
+    
+    total_xp = (base_xp * difficulty) + bonus
+    
+    # Log, points, level/badge and daily bucket in one transaction (migrations/012)
+    return supabase.rpc("award_quiz_xp", {
+        "p_student_id": user_id,
+        "p_quiz_id": quiz_id,
+        "p_result_id": result_id,
+        "p_xp": total_xp,
+        "p_reason": f"Quiz completed: Score {score}%"
+    }).execute().data
+
+
+def _today():
+    return datetime.datetime.now(datetime.timezone.utc).date()
+
+
+def xp_summary(student_id, recent=5):
+    """XP earned in the last 7 and 30 days (today included), the current daily streak and latest earnings.
+
+    One call to the ``xp_summary`` database function (migrations/010), which
+    returns the student's daily buckets - at most ``BUCKET_DAYS`` rows - and
+    their ``recent`` newest transactions. A streak counts back from today, or
+    from yesterday if nothing has been earned yet today.
+    """
+    summary = supabase.rpc("xp_summary", {"p_student_id": student_id, "p_recent": recent}).execute().data or {}
+    rows = summary.get('buckets') or []
+    today = _today()
+    by_age = {}
+    for r in rows:
+        age = (today - datetime.date.fromisoformat(r['day'])).days
+        # Slots left over from an earlier lap of the ring are ignored
+        if 0 <= age < BUCKET_DAYS and r['xp'] > 0:
+            by_age[age] = r['xp']
+
+    streak = 0
+    age = 0 if 0 in by_age else 1
+    while age in by_age:
+        streak += 1
+        age += 1
+
+    return {
+        "week": sum(xp for age, xp in by_age.items() if age < 7),
+        "month": sum(xp for age, xp in by_age.items() if age < 30),
+        "streak": streak,
+        "recent": summary.get('recent') or [],
+    }
+
+
+def weekly_leaderboard(course_id=None, limit=10):
+    """Top students by XP over the last 7 days, for one course or everyone."""
+    since = (_today() - datetime.timedelta(days=6)).isoformat()
+    return supabase.rpc("xp_leaderboard", {"p_since": since, "p_course_id": course_id, "p_limit": limit}).execute().data or []
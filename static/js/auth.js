@@ -55,7 +55,7 @@ async function handleLogin() {
     try {
         // CALL THE FLASK BACKEND (The Proxy Pattern)
         // We do not call Supabase directly here. We ask Flask to do it.
-        const response = await fetch('/api/login', {
+        const response = await fetch('/api/v1/login', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ 
@@ -64,11 +64,12 @@ async function handleLogin() {
             })
         });
 
-        const data = await response.json();
+        const body = await response.json();
 
         if (!response.ok) {
-            throw new Error(data.error || "Login failed. Please check your credentials.");
+            throw new Error(body.error || "Login failed. Please check your credentials.");
         }
+        const data = body.data;
 
         // SUCCESS!
         // 1. Store the session token (useful for future API calls)
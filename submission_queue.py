@@ -0,0 +1,273 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+import httpx
+from flask import current_app
+
+from services import submissions
+
+SCHEMA = """
+create table if not exists submissions (
+    submission_id text primary key,
+    student_id text not null,
+    quiz_id text not null,
+    payload text not null,
+    status text not null default 'pending',
+    claimed_at real,
+    result_id text,
+    created_at real not null,
+    attempts integer not null default 0,
+    retry_at real,
+    last_error text,
+    followed_up integer not null default 0
+);
+create index if not exists submissions_status_idx on submissions (status, created_at);
+"""
+
+# Added after the first release; existing queue files get them on open
+ADDED_COLUMNS = {
+    "attempts": "integer not null default 0",
+    "retry_at": "real",
+    "last_error": "text",
+    "followed_up": "integer not null default 0",
+}
+
+# Drained rows are kept this long so the pending result page can redirect
+DONE_RETENTION_SECONDS = 24 * 60 * 60
+# Backoff between retries of a row the database rejected
+RETRY_BACKOFF_SECONDS = 2
+MAX_RETRY_BACKOFF_SECONDS = 300
+
+
+class SubmissionQueue:
+    """Durable local queue of graded submissions waiting for ``exam_results``.
+
+    Backed by SQLite in WAL mode so every worker on the host can append and
+    drain concurrently, and nothing accepted is lost on a restart. Rows are
+    keyed by submission id, so a resubmitted form is only queued once.
+
+    A row goes pending -> inflight -> done, and is then followed up
+    (gradebook, XP, ...) separately, tracked by ``followed_up``. A row the
+    database keeps rejecting is retried with backoff and, after
+    ``max_attempts``, parked as ``dead`` so it can't hold up the rest.
+    """
+
+    def __init__(self, path, lease_seconds=60, max_attempts=8):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with closing(self._connect()) as db:
+            db.execute("pragma journal_mode=wal")
+            db.executescript(SCHEMA)
+            columns = {row['name'] for row in db.execute("pragma table_info(submissions)")}
+            for name, definition in ADDED_COLUMNS.items():
+                if name not in columns:
+                    db.execute(f"alter table submissions add column {name} {definition}")
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.execute("pragma synchronous=full")
+        db.row_factory = sqlite3.Row
+        return db
+
+    def enqueue(self, row):
+        """Queue an exam_results row. Returns False if its submission id is already queued."""
+        with closing(self._connect()) as db:
+            cur = db.execute(
+                "insert or ignore into submissions (submission_id, student_id, quiz_id, payload, created_at) "
+                "values (?, ?, ?, ?, ?)",
+                (row['submission_id'], row['student_id'], row['quiz_id'], json.dumps(row), time.time()),
+            )
+            return cur.rowcount == 1
+
+    def get(self, submission_id):
+        with closing(self._connect()) as db:
+            entry = db.execute("select * from submissions where submission_id = ?", (submission_id,)).fetchone()
+        return dict(entry) if entry else None
+
+    def claim(self, limit):
+        """Take up to ``limit`` pending rows due for a try (or rows whose claim has expired)."""
+        now = time.time()
+        with closing(self._connect()) as db:
+            db.execute("begin immediate")
+            entries = db.execute(
+                "select * from submissions "
+                "where (status = 'pending' and (retry_at is null or retry_at <= ?)) "
+                "or (status = 'inflight' and claimed_at < ?) "
+                "order by created_at limit ?",
+                (now, now - self.lease_seconds, limit),
+            ).fetchall()
+            db.executemany(
+                "update submissions set status = 'inflight', claimed_at = ? where submission_id = ?",
+                [(now, e['submission_id']) for e in entries],
+            )
+            db.execute("commit")
+        return [dict(e) for e in entries]
+
+    def complete(self, result_ids):
+        with closing(self._connect()) as db:
+            db.execute("begin immediate")
+            db.executemany(
+                "update submissions set status = 'done', result_id = ?, claimed_at = null where submission_id = ?",
+                [(result_id, submission_id) for submission_id, result_id in result_ids.items()],
+            )
+            db.execute("commit")
+
+    def release(self, submission_ids):
+        """Put rows back untouched (the backend was unreachable, not the rows' fault)."""
+        with closing(self._connect()) as db:
+            db.executemany(
+                "update submissions set status = 'pending', claimed_at = null where submission_id = ?",
+                [(i,) for i in submission_ids],
+            )
+
+    def fail(self, submission_id, error):
+        """Record a rejected row: retry it later with backoff, or park it once out of attempts."""
+        with closing(self._connect()) as db:
+            db.execute("begin immediate")
+            entry = db.execute("select attempts from submissions where submission_id = ?", (submission_id,)).fetchone()
+            attempts = (entry['attempts'] if entry else 0) + 1
+            status = "dead" if attempts >= self.max_attempts else "pending"
+            backoff = min(RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1), MAX_RETRY_BACKOFF_SECONDS)
+            db.execute(
+                "update submissions set status = ?, attempts = ?, retry_at = ?, last_error = ?, claimed_at = null "
+                "where submission_id = ?",
+                (status, attempts, time.time() + backoff, error, submission_id),
+            )
+            db.execute("commit")
+        return status
+
+    def claim_follow_ups(self, limit):
+        """Take up to ``limit`` saved rows whose follow-up work hasn't finished."""
+        now = time.time()
+        with closing(self._connect()) as db:
+            db.execute("begin immediate")
+            entries = db.execute(
+                "select * from submissions "
+                "where status = 'done' and followed_up = 0 and (claimed_at is null or claimed_at < ?) "
+                "order by created_at limit ?",
+                (now - self.lease_seconds, limit),
+            ).fetchall()
+            db.executemany(
+                "update submissions set claimed_at = ? where submission_id = ?",
+                [(now, e['submission_id']) for e in entries],
+            )
+            db.execute("commit")
+        return [dict(e) for e in entries]
+
+    def mark_followed_up(self, submission_id):
+        with closing(self._connect()) as db:
+            db.execute("update submissions set followed_up = 1, claimed_at = null where submission_id = ?", (submission_id,))
+
+    def pending_count(self):
+        with closing(self._connect()) as db:
+            return db.execute("select count(*) from submissions where status in ('pending', 'inflight')").fetchone()[0]
+
+    def dead(self):
+        """Rows parked after too many rejections, for an operator to inspect."""
+        with closing(self._connect()) as db:
+            return [dict(e) for e in db.execute("select * from submissions where status = 'dead' order by created_at")]
+
+    def purge_done(self, max_age=DONE_RETENTION_SECONDS):
+        with closing(self._connect()) as db:
+            db.execute("delete from submissions where status = 'done' and followed_up = 1 and created_at < ?",
+                       (time.time() - max_age,))
+
+
+def _save(queue, entries):
+    """Insert claimed rows. A rejected batch is retried row by row so one bad row can't block the rest."""
+    try:
+        queue.complete(submissions.save_results([json.loads(e['payload']) for e in entries]))
+    except httpx.TransportError:
+        # Backend unreachable: the rows wait, no attempts are counted
+        queue.release([e['submission_id'] for e in entries])
+        raise
+    except Exception as e:
+        if len(entries) == 1:
+            if queue.fail(entries[0]['submission_id'], str(e)) == "dead":
+                print(f"Submission {entries[0]['submission_id']} parked after repeated failures: {str(e)}")
+            return
+        for i, entry in enumerate(entries):
+            try:
+                _save(queue, [entry])
+            except httpx.TransportError:
+                queue.release([e['submission_id'] for e in entries[i + 1:]])
+                raise
+
+
+def follow_up(queue, batch_size):
+    """Run after_save for saved rows not yet followed up. Returns the number done."""
+    done = 0
+    for entry in queue.claim_follow_ups(batch_size):
+        try:
+            submissions.after_save(entry['result_id'], json.loads(entry['payload']))
+        except Exception as e:
+            # Left unmarked: picked up again once the claim expires
+            print(f"Error following up submission {entry['submission_id']}: {str(e)}")
+            continue
+        queue.mark_followed_up(entry['submission_id'])
+        done += 1
+    return done
+
+
+def drain_once(queue, batch_size):
+    """Flush one batch to exam_results, then follow up saved rows. Returns the number of rows claimed."""
+    entries = queue.claim(batch_size)
+    if entries:
+        _save(queue, entries)
+    follow_up(queue, batch_size)
+    if not entries:
+        queue.purge_done()
+    return len(entries)
+
+
+class Drainer(threading.Thread):
+    """Background thread that flushes the queue every ``interval`` seconds."""
+
+    def __init__(self, app, queue):
+        super().__init__(name="submission-drainer", daemon=True)
+        self.app = app
+        self.queue = queue
+        self.batch_size = app.config["SUBMISSION_DRAIN_BATCH"]
+        self.interval = app.config["SUBMISSION_DRAIN_INTERVAL"]
+
+    def run(self):
+        while True:
+            with self.app.app_context():
+                try:
+                    while drain_once(self.queue, self.batch_size) == self.batch_size:
+                        pass
+                except Exception as e:
+                    print(f"Error draining submissions: {str(e)}")
+            time.sleep(self.interval)
+
+
+def init_app(app):
+    """Set up the queue when SUBMISSION_MODE is "buffered"."""
+    if app.config["SUBMISSION_MODE"] != "buffered":
+        return
+
+    queue = SubmissionQueue(app.config["SUBMISSION_QUEUE_PATH"], app.config["SUBMISSION_LEASE_SECONDS"],
+                            app.config["SUBMISSION_MAX_ATTEMPTS"])
+    app.extensions["submission_queue"] = queue
+    drainer_lock = threading.Lock()
+
+    # Started per worker on its first request: threads don't survive the
+    # gunicorn fork, and this also flushes anything left from before a restart.
+    @app.before_request
+    def start_drainer():
+        if app.extensions.get("submission_drainer") is None:
+            with drainer_lock:
+                if app.extensions.get("submission_drainer") is None:
+                    drainer = Drainer(app, queue)
+                    drainer.start()
+                    app.extensions["submission_drainer"] = drainer
+
+
+def get_queue():
+    return current_app.extensions.get("submission_queue")
@@ -0,0 +1,37 @@
+import os
+
+from jinja2 import FileSystemBytecodeCache, TemplateSyntaxError
+
+
+def init_app(app):
+    """Keep compiled templates in an on-disk bytecode cache shared by all workers.
+
+    Must run before anything touches ``app.jinja_env`` (registering the
+    blueprint's filters does), since the options are read when it is built.
+    Template auto-reload follows Flask's default: on only in debug mode or
+    when TEMPLATES_AUTO_RELOAD is set, so production skips the mtime checks.
+    """
+    cache_dir = app.config["TEMPLATE_CACHE_DIR"]
+    if not cache_dir:
+        return
+    os.makedirs(cache_dir, exist_ok=True)
+    app.jinja_options = {**app.jinja_options, "bytecode_cache": FileSystemBytecodeCache(cache_dir)}
+
+
+def precompile(app):
+    """Load every template into the environment's in-memory cache.
+
+    Compiles (or reads from the bytecode cache) up front, so the first
+    request for each page doesn't pay for it. Called by gunicorn in the
+    master before forking, so workers inherit the compiled templates.
+    Returns the number of templates loaded.
+    """
+    loaded = 0
+    for name in app.jinja_env.list_templates(extensions=["html"]):
+        try:
+            app.jinja_env.get_template(name)
+            loaded += 1
+        except TemplateSyntaxError as e:
+            # Leave it to fail on its own page rather than block startup
+            print(f"Error compiling template {name}: {str(e)}")
+    return loaded
@@ -0,0 +1,428 @@
+import contextlib
+import hashlib
+import json
+import os
+import threading
+import time
+
+import httpx
+from tenacity import (
+    Retrying,
+    retry_if_exception_type,
+    retry_if_result,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
+
+# Reads are safe to repeat; writes are never retried
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+RETRY_STATUSES = {502, 503, 504}
+RETRY_EXCEPTIONS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.ReadTimeout, httpx.RemoteProtocolError)
+
+# Requests differing only in other headers get the same answer; these can change it
+COALESCE_KEY_HEADERS = ("authorization", "apikey", "accept", "accept-profile", "prefer", "range")
+# The shared body is stored decoded, so these no longer describe it
+STRIPPED_RESPONSE_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+# Backend functions can write any table; a call to one invalidates every path
+RPC_PATH = "/rpc/"
+ALL_PATHS = "*"
+# How often a worker clears out the file flight's expired results
+FILE_FLIGHT_SWEEP_SECONDS = 60
+
+
+class BackendUnavailable(httpx.TransportError):
+    """Raised without touching the network while the circuit breaker is open."""
+
+    def __init__(self, message, *, request=None, retry_after=0):
+        super().__init__(message, request=request)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Fail fast after ``threshold`` consecutive backend failures.
+
+    Once open, calls are rejected for ``reset_timeout`` seconds. After that a
+    single trial call is let through (half-open): success closes the circuit,
+    failure opens it again.
+    """
+
+    def __init__(self, threshold=5, reset_timeout=30.0):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def retry_after(self):
+        if self.opened_at is None:
+            return 0
+        return max(0, int(self.reset_timeout - (time.monotonic() - self.opened_at)) + 1)
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release(self):
+        """End a call that said nothing about the backend's health (a bug, not an outage)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class ResilientTransport(httpx.BaseTransport):
+    """httpx transport that retries idempotent reads and trips a circuit breaker."""
+
+    def __init__(self, transport, breaker, attempts=3, backoff=0.2, max_backoff=2.0):
+        self.transport = transport
+        self.breaker = breaker
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def handle_request(self, request):
+        if request.method not in IDEMPOTENT_METHODS:
+            return self._send(request)
+
+        retrying = Retrying(
+            stop=stop_after_attempt(self.attempts),
+            wait=wait_exponential_jitter(initial=self.backoff, max=self.max_backoff),
+            retry=(retry_if_exception_type(RETRY_EXCEPTIONS)
+                   | retry_if_result(lambda response: response.status_code in RETRY_STATUSES)),
+            # Out of attempts: hand back the last response or raise the last error
+            retry_error_callback=lambda state: state.outcome.result(),
+        )
+        return retrying(self._send, request)
+
+    def _send(self, request):
+        if not self.breaker.allow():
+            raise BackendUnavailable(
+                "Backend circuit is open; failing fast", request=request, retry_after=self.breaker.retry_after()
+            )
+
+        try:
+            response = self.transport.handle_request(request)
+        except httpx.TransportError:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # Otherwise a half-open trial would stay "in flight" and the circuit never close
+            self.breaker.release()
+            raise
+
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+            if response.status_code in RETRY_STATUSES:
+                # Buffer the body so the connection goes back to the pool before a retry
+                response.read()
+        else:
+            self.breaker.record_success()
+        return response
+
+    def close(self):
+        self.transport.close()
+
+
+class SingleFlight:
+    """Coalesce identical concurrent calls within a process.
+
+    The first caller for a key runs ``fn``; callers arriving while it is in
+    flight wait and share its result (or its exception). With ``window`` > 0
+    a finished result is also reused for that many seconds.
+    """
+
+    def __init__(self, window=0.0):
+        self.window = window
+        self._calls = {}
+        self._recent = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            recent = self._recent.get(key)
+            if recent is not None and time.monotonic() - recent[0] < self.window:
+                return recent[1]
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                if call.error is None and self.window:
+                    now = time.monotonic()
+                    self._recent = {k: v for k, v in self._recent.items() if now - v[0] < self.window}
+                    self._recent[key] = (now, call.result)
+            call.done.set()
+        return call.result
+
+    def forget(self, predicate):
+        """Drop reusable results whose key matches, e.g. after a write."""
+        with self._lock:
+            self._recent = {k: v for k, v in self._recent.items() if not predicate(k)}
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class FileSingleFlight:
+    """Cross-worker coalescing through lock files in a local directory.
+
+    Each key gets its own file. The worker holding the file's lock makes the
+    call and writes the result into it; workers that queued on the lock
+    meanwhile find that result and use it instead of calling again. Results
+    older than ``window`` seconds before a waiter arrived are ignored, and
+    files unused for longer than that are swept away.
+    """
+
+    def __init__(self, directory, window=0.0):
+        import fcntl  # Unix only, like gunicorn
+
+        self._fcntl = fcntl
+        self.directory = directory
+        self.window = window
+        self._swept_at = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    def do(self, key, fn, fresh_after=0.0):
+        """Like ``SingleFlight.do``; results from calls started before ``fresh_after`` aren't shared."""
+        path = os.path.join(self.directory, hashlib.sha256(repr(key).encode()).hexdigest())
+        arrived = time.time()
+        try:
+            with self._locked(path) as f:
+                shared = self._read(f, arrived - self.window, fresh_after)
+                if shared is not None:
+                    return shared
+                started = time.time()
+                result = fn()
+                self._write(f, started, result)
+                return result
+        finally:
+            if arrived - self._swept_at > FILE_FLIGHT_SWEEP_SECONDS:
+                self._swept_at = arrived
+                self._sweep(arrived - self.window - FILE_FLIGHT_SWEEP_SECONDS)
+
+    def mark_written(self, scope):
+        """Record a write, so results fetched before it stop being shared."""
+        try:
+            with open(self._marker(scope), "w") as f:
+                f.write(repr(time.time()))
+        except OSError as e:
+            print(f"Error sharing backend write: {str(e)}")
+
+    def last_written(self, scope):
+        try:
+            with open(self._marker(scope)) as f:
+                return float(f.read())
+        except FileNotFoundError:
+            return 0.0
+        except (OSError, ValueError):
+            # Unreadable or mid-write: treat it as just written
+            return time.time()
+
+    def _marker(self, scope):
+        return os.path.join(self.directory, f"written-{hashlib.sha256(scope.encode()).hexdigest()}")
+
+    @contextlib.contextmanager
+    def _locked(self, path, blocking=True):
+        # A sweep may unlink the file while we wait on its lock; only a lock
+        # on the file still at ``path`` counts. Non-blocking (for the sweep)
+        # raises OSError if the file is busy or gone.
+        flags = self._fcntl.LOCK_EX | (0 if blocking else self._fcntl.LOCK_NB)
+        while True:
+            f = open(path, "a+b" if blocking else "rb")
+            try:
+                self._fcntl.flock(f, flags)
+                if self._is_current(f, path):
+                    break
+            except BaseException:
+                f.close()
+                raise
+            f.close()
+        try:
+            yield f
+        finally:
+            f.close()
+
+    @staticmethod
+    def _is_current(f, path):
+        try:
+            return os.fstat(f.fileno()).st_ino == os.stat(path).st_ino
+        except FileNotFoundError:
+            return False
+
+    def _read(self, f, not_before, fresh_after):
+        try:
+            f.seek(0)
+            meta = json.loads(f.readline())
+            if meta["written_at"] < not_before or meta["started_at"] < fresh_after:
+                return None
+            body = f.read()
+            if len(body) != meta["length"]:  # a write that failed part way
+                return None
+            return meta["status"], [tuple(h) for h in meta["headers"]], body
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write(self, f, started, result):
+        status, headers, body = result
+        try:
+            f.seek(0)
+            f.truncate()
+            f.write(json.dumps({"written_at": time.time(), "started_at": started,
+                                "status": status, "headers": headers, "length": len(body)}).encode() + b"\n")
+            f.write(body)
+            f.flush()
+        except OSError as e:
+            print(f"Error sharing backend response: {str(e)}")
+
+    def _sweep(self, older_than):
+        """Delete result files last written before ``older_than``, skipping any in use."""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if len(name) != 64:  # write markers
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                if os.stat(path).st_mtime >= older_than:
+                    continue
+                with self._locked(path, blocking=False) as f:
+                    if os.fstat(f.fileno()).st_mtime < older_than:
+                        os.unlink(path)
+            except OSError:
+                continue
+
+
+class CoalescingTransport(httpx.BaseTransport):
+    """httpx transport that sends identical concurrent reads to the backend once.
+
+    GETs are keyed on URL plus the headers that can change the answer (auth
+    included, so users never share results). Each write to a table path
+    bumps that path's generation, which is part of the key, so a read issued
+    after the write never joins or reuses one that may have started before
+    it. A function call (POST to /rpc/) may write any table, so it counts as
+    a write to every path. Across workers, the file flight does the same
+    with per-path write times.
+    """
+
+    def __init__(self, transport, flight, file_flight=None):
+        self.transport = transport
+        self.flight = flight
+        self.file_flight = file_flight
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def handle_request(self, request):
+        path = request.url.path
+        if request.method != "GET":
+            scope = ALL_PATHS if RPC_PATH in path else path
+            try:
+                return self.transport.handle_request(request)
+            finally:
+                with self._lock:
+                    self._generations[scope] = self._generations.get(scope, 0) + 1
+                self.flight.forget(lambda key: scope in (ALL_PATHS, key[0]))
+                if self.file_flight is not None:
+                    self.file_flight.mark_written(scope)
+
+        key = (path, request.url.query, tuple(request.headers.get(h, "") for h in COALESCE_KEY_HEADERS))
+        with self._lock:
+            generation = (self._generations.get(path, 0), self._generations.get(ALL_PATHS, 0))
+        fetch = lambda: self._fetch(request)
+        if self.file_flight is not None:
+            # Writes made by other workers start a new generation here too
+            fresh_after = max(self.file_flight.last_written(path), self.file_flight.last_written(ALL_PATHS))
+            generation += (fresh_after,)
+            fetch = lambda: self.file_flight.do(key, lambda: self._fetch(request), fresh_after)
+        status, headers, body = self.flight.do(key + generation, fetch)
+        return httpx.Response(status, headers=headers, content=body, request=request)
+
+    def _fetch(self, request):
+        response = self.transport.handle_request(request)
+        try:
+            body = response.read()
+        finally:
+            response.close()
+        headers = [(k, v) for k, v in response.headers.multi_items() if k.lower() not in STRIPPED_RESPONSE_HEADERS]
+        return response.status_code, headers, body
+
+    def close(self):
+        self.transport.close()
+
+
+def build_http_client(config):
+    """Create the pooled httpx client shared by every backend call in a worker."""
+    limits = httpx.Limits(
+        max_connections=config["BACKEND_MAX_CONNECTIONS"],
+        max_keepalive_connections=config["BACKEND_MAX_KEEPALIVE"],
+        keepalive_expiry=config["BACKEND_KEEPALIVE_EXPIRY"],
+    )
+    timeout = httpx.Timeout(
+        connect=config["BACKEND_CONNECT_TIMEOUT"],
+        read=config["BACKEND_READ_TIMEOUT"],
+        write=config["BACKEND_WRITE_TIMEOUT"],
+        pool=config["BACKEND_POOL_TIMEOUT"],
+    )
+    breaker = CircuitBreaker(
+        threshold=config["BACKEND_BREAKER_THRESHOLD"],
+        reset_timeout=config["BACKEND_BREAKER_RESET"],
+    )
+    transport = ResilientTransport(
+        httpx.HTTPTransport(http2=config["BACKEND_HTTP2"], limits=limits),
+        breaker,
+        attempts=config["BACKEND_RETRY_ATTEMPTS"],
+        backoff=config["BACKEND_RETRY_BACKOFF"],
+        max_backoff=config["BACKEND_RETRY_MAX_BACKOFF"],
+    )
+    if config["SINGLE_FLIGHT"]:
+        window = config["SINGLE_FLIGHT_WINDOW"]
+        file_flight = FileSingleFlight(config["SINGLE_FLIGHT_DIR"], window) if config["SINGLE_FLIGHT_DIR"] else None
+        transport = CoalescingTransport(transport, SingleFlight(window), file_flight)
+    return httpx.Client(transport=transport, timeout=timeout, follow_redirects=True)
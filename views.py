@@ -0,0 +1,1090 @@
+from flask import Blueprint, Response, current_app, render_template, request, redirect, url_for, flash, session, jsonify, make_response, stream_with_context
+import json
+import csv
+from io import StringIO
+import datetime
+import time
+
+from backend import supabase
+import activity_feed
+import fetching
+import submission_queue
+from services import attempts, deletion, enrollment, gradebook, grades, grading, membership, roster, submissions, xp
+
+bp = Blueprint("main", __name__)
+
+# ==========================================
+# CUSTOM JINJA2 FILTERS
+# ==========================================
+
+@bp.app_template_filter('datetime')
+def format_datetime(value, format='%b %d, %Y %I:%M %p'):
+    """Format a datetime string or object."""
+    if not value:
+        return ""
+    
+    # If it's already a datetime object
+    if isinstance(value, datetime.datetime):
+        return value.strftime(format)
+    
+    # If it's a string, try to parse it
+    if isinstance(value, str):
+        try:
+            # Try different datetime formats
+            for fmt in ['%Y-%m-%dT%H:%M:%S.%f%z', 
+                       '%Y-%m-%dT%H:%M:%S%z',
+                       '%Y-%m-%d %H:%M:%S',
+                       '%Y-%m-%d']:
+                try:
+                    dt = datetime.datetime.strptime(value, fmt)
+                    return dt.strftime(format)
+                except ValueError:
+                    continue
+        except Exception:
+            pass
+    
+    # If all else fails, return the original value
+    return str(value)
+
+@bp.app_template_filter('shortdate')
+def format_shortdate(value):
+    """Format date as short string."""
+    return format_datetime(value, '%b %d')
+
+@bp.app_template_filter('timeago')
+def time_ago(value):
+    """Return how long ago something happened."""
+    if not value:
+        return ""
+    
+    # Parse the datetime
+    if isinstance(value, str):
+        try:
+            dt = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except:
+            return value
+    elif isinstance(value, datetime.datetime):
+        dt = value
+    else:
+        return str(value)
+    
+    now = datetime.datetime.now(datetime.timezone.utc)
+    if dt.tzinfo:
+        dt = dt.astimezone(datetime.timezone.utc)
+    
+    diff = now - dt
+    
+    if diff.days > 365:
+        years = diff.days // 365
+        return f"{years} year{'s' if years > 1 else ''} ago"
+    elif diff.days > 30:
+        months = diff.days // 30
+        return f"{months} month{'s' if months > 1 else ''} ago"
+    elif diff.days > 0:
+        return f"{diff.days} day{'s' if diff.days > 1 else ''} ago"
+    elif diff.seconds > 3600:
+        hours = diff.seconds // 3600
+        return f"{hours} hour{'s' if hours > 1 else ''} ago"
+    elif diff.seconds > 60:
+        minutes = diff.seconds // 60
+        return f"{minutes} minute{'s' if minutes > 1 else ''} ago"
+    else:
+        return "just now"
+
+# ==========================================
+# AUTHENTICATION & LANDING
+# ==========================================
+
+@bp.route('/')
+def role_select():
+    return render_template('role_select.html')
+
+@bp.route('/portal/<role>')
+def portal_choice(role):
+    if role not in ['student', 'instructor', 'admin']:
+        return redirect(url_for('main.role_select'))
+    return render_template('auth_choice.html', role=role)
+
+@bp.route('/auth/register/<role>', methods=['GET', 'POST'])
+def register(role):
+    if request.method == 'GET':
+        return render_template('register.html', role=role)
+
+    try:
+        email = request.form.get('email')
+        password = request.form.get('password')
+        full_name = request.form.get('full_name')
+        department = request.form.get('department')
+        
+        # 1. Create Auth User
+        auth_response = supabase.auth.sign_up({"email": email, "password": password})
+        if not auth_response.user: raise Exception("Registration failed.")
+        user_id = auth_response.user.id
+
+        # 2. Insert into 'users'
+        supabase.table("users").insert({
+            "id": user_id, "email": email, "full_name": full_name, "role": role
+        }).execute()
+
+        # 3. Insert into Profile
+        if role == 'student':
+            supabase.table("student_profiles").insert({
+                "user_id": user_id, 
+                "student_id": request.form.get('student_id'), 
+                "department": department
+            }).execute()
+        elif role == 'instructor':
+            supabase.table("instructor_profiles").insert({
+                "user_id": user_id, 
+                "lecturer_id": request.form.get('lecturer_id'), 
+                "department": department
+            }).execute()
+            
+        flash("Account created successfully! Please login.", "success")
+        return redirect(url_for('main.login', role=role))
+
+    except Exception as e:
+        if "User already registered" in str(e):
+             flash("You already have an account! Please login.", "warning")
+             return redirect(url_for('main.login', role=role))
+        flash(f"Error: {str(e)}", "error")
+        return redirect(url_for('main.register', role=role))
+
+@bp.route('/auth/login/<role>', methods=['GET', 'POST'])
+def login(role):
+    if request.method == 'GET':
+        return render_template('login.html', role=role)
+    
+    email = request.form.get('email')
+    password = request.form.get('password')
+    
+    try:
+        # Auth and Check Role
+        auth_response = supabase.auth.sign_in_with_password({"email": email, "password": password})
+        user_id = auth_response.user.id
+        
+        user_data = supabase.table("users").select("role, full_name").eq("id", user_id).single().execute()
+        
+        if user_data.data['role'] != role:
+            flash(f"Wrong portal! You are a {user_data.data['role']}.", "error")
+            return redirect(url_for('main.role_select'))
+            
+        session['user_id'] = user_id
+        session['role'] = role
+        session['full_name'] = user_data.data['full_name']
+        
+        if role == 'instructor':
+            return redirect(url_for('main.instructor_dashboard')) 
+        elif role == 'student':
+            return redirect(url_for('main.student_dashboard'))
+
+    except Exception as e:
+        flash("Invalid Credentials", "error")
+        return redirect(url_for('main.login', role=role))
+
+@bp.route('/logout')
+def logout():
+    session.clear()
+    return redirect(url_for('main.role_select'))
+
+# ==========================================
+# SHARED / DASHBOARD ROUTING
+# ==========================================
+
+@bp.route('/dashboard')
+def dashboard():
+    if 'user_id' not in session: return redirect(url_for('main.role_select'))
+    if session['role'] == 'instructor': return redirect(url_for('main.instructor_dashboard'))
+    if session['role'] == 'student': return redirect(url_for('main.student_dashboard'))
+    return redirect(url_for('main.role_select'))
+
+# ==========================================
+# INSTRUCTOR MODULES
+# ==========================================
+
+@bp.route('/instructor/dashboard')
+def instructor_dashboard():
+    if 'user_id' not in session or session['role'] != 'instructor': return redirect(url_for('main.role_select'))
+    user_id = session['user_id']
+
+    try:
+        profile = supabase.table("instructor_profiles").select("*").eq("user_id", user_id).single().execute()
+        
+        # Stats
+        courses_query = supabase.table("courses").select("*", count="exact").eq("instructor_id", user_id).execute()
+        student_query = supabase.table("student_profiles").select("*", count="exact").execute()
+        
+        # Calc Avg Score
+        scores_data = supabase.table("exam_results").select("score").execute()
+        scores = [row['score'] for row in scores_data.data]
+        avg_score = round(sum(scores) / len(scores)) if len(scores) > 0 else 0
+
+        # Recent Activity
+        recent_activity = supabase.table("exam_results").select("*, users(full_name), courses(title)")\
+            .order("submitted_at", desc=True).limit(3).execute()
+
+        return render_template('instructor_dashboard.html', 
+                               user=session, 
+                               profile=profile.data,
+                               stats={ "courses": courses_query.count, "students": student_query.count, "avg_score": avg_score, "reviews": 0 },
+                               activity=recent_activity.data)
+    except Exception as e:
+        return f"Error loading dashboard: {e}"
+
+# LIVE ACTIVITY FEED (server-sent events of submissions and proctoring flags)
+@bp.route('/instructor/activity/stream')
+def instructor_activity_stream():
+    if 'user_id' not in session or session['role'] != 'instructor': return "", 401
+    user_id = session['user_id']
+    broker = activity_feed.get_broker()
+    subscriber = broker.subscribe()
+    if subscriber is None:
+        # Every stream slot is taken: keep the rest of the threads for students
+        return "", 503, {"Retry-After": "30"}
+
+    quizzes, names = {}, {}
+    last_refresh = [0.0]
+
+    def load_quizzes():
+        rows = supabase.table("quizzes").select("id, title, courses!inner(title, instructor_id)")\
+            .eq("courses.instructor_id", user_id).execute().data
+        quizzes.update({q['id']: q for q in rows})
+        last_refresh[0] = time.monotonic()
+
+    def describe(event):
+        # A quiz created since the stream opened: reload, at most every 30s
+        if event['quiz_id'] not in quizzes and time.monotonic() - last_refresh[0] > 30:
+            load_quizzes()
+        quiz = quizzes.get(event['quiz_id'])
+        if quiz is None:
+            return None
+        if event['student_id'] not in names:
+            user = supabase.table("users").select("full_name").eq("id", event['student_id']).execute().data
+            names[event['student_id']] = user[0]['full_name'] if user else "Unknown"
+        return dict(event, student_name=names[event['student_id']], quiz_title=quiz['title'], course_title=quiz['courses']['title'])
+
+    try:
+        load_quizzes()
+    except Exception:
+        broker.unsubscribe(subscriber)
+        raise
+    events = activity_feed.stream(broker, subscriber, describe,
+                                  current_app.config['ACTIVITY_HEARTBEAT_SECONDS'],
+                                  current_app.config['ACTIVITY_STREAM_MAX_SECONDS'])
+    response = Response(stream_with_context(events), mimetype='text/event-stream',
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    # Frees the slot even if the client leaves before the stream starts
+    response.call_on_close(lambda: broker.unsubscribe(subscriber))
+    return response
+
+@bp.route('/instructor/courses')
+def instructor_courses():
+    if 'user_id' not in session or session['role'] != 'instructor': return redirect(url_for('main.role_select'))
+    user_id = session['user_id']
+    
+    courses = supabase.table("courses").select("*").eq("instructor_id", user_id).order("created_at", desc=True).execute()
+    profile = supabase.table("instructor_profiles").select("*").eq("user_id", user_id).single().execute()
+    
+    return render_template('instructor_courses.html', user=session, profile=profile.data, courses=courses.data)
+
+@bp.route('/instructor/create_course', methods=['POST'])
+def create_course():
+    if 'user_id' not in session or session['role'] != 'instructor': return redirect(url_for('main.role_select'))
+    try:
+        supabase.table("courses").insert({
+            "instructor_id": session['user_id'],
+            "title": request.form.get('title'),
+            "description": request.form.get('description'),
+            "category": request.form.get('category')
+        }).execute()
+        flash("Course created successfully!", "success")
+    except Exception as e:
+        flash(f"Error creating course: {str(e)}", "error")
+    return redirect(url_for('main.instructor_courses'))
+
+@bp.route('/instructor/course/<course_id>')
+def course_detail(course_id):
+    if 'user_id' not in session or session['role'] != 'instructor': return redirect(url_for('main.role_select'))
+    
+    course = supabase.table("courses").select("*").eq("id", course_id).single().execute()
+    quizzes = supabase.table("quizzes").select("*").eq("course_id", course_id).order("created_at", desc=True).execute()
+    
+    return render_template('course_detail.html', user=session, course=course.data, quizzes=quizzes.data)
+
+# --- QUIZ MANAGEMENT ---
+
+@bp.route('/instructor/create_quiz/<course_id>', methods=['POST'])
+def create_quiz(course_id):
+    try:
+        # UPDATE: Added max_attempts to insert
+        created = supabase.table("quizzes").insert({
+            "course_id": course_id,
+            "title": request.form.get('title'),
+            "duration_minutes": request.form.get('duration'),
+            "max_attempts": request.form.get('max_attempts', 1) 
+        }).execute().data
+        membership.add_quiz(course_id, created[0]['id'])
+        flash("Quiz created successfully!", "success")
+    except Exception as e:
+        flash(f"Error: {str(e)}", "error")
+    return redirect(url_for('main.course_detail', course_id=course_id))
+
+@bp.route('/instructor/quiz/<quiz_id>')
+def quiz_editor(quiz_id):
+    if 'user_id' not in session or session['role'] != 'instructor': return redirect(url_for('main.role_select'))
+    
+    quiz = supabase.table("quizzes").select("*, courses(title, id)").eq("id", quiz_id).single().execute()
+    questions = supabase.table("questions").select("*").eq("quiz_id", quiz_id).order("id", desc=False).execute()
+    return render_template('quiz_editor.html', user=session, quiz=quiz.data, questions=questions.data)
+
+@bp.route('/instructor/add_question/<quiz_id>', methods=['POST'])
+def add_question(quiz_id):
+    try:
+        q_type = request.form.get('question_type')
+        data = { "quiz_id": quiz_id, "question_text": request.form.get('question_text'), "question_type": q_type }
+
+        if q_type == 'MCQ':
+            data.update({
+                "option_a": request.form.get('option_a'), "option_b": request.form.get('option_b'),
+                "option_c": request.form.get('option_c'), "option_d": request.form.get('option_d'),
+                "correct_option": request.form.get('correct_option')
+            })
+        elif q_type == 'FILL_BLANK':
+            data.update({ "correct_option": request.form.get('correct_text') })
+        elif q_type == 'THEORY':
+            data.update({ "keywords": request.form.get('keywords') })
+        
+        supabase.table("questions").insert(data).execute()
+        flash("Question added successfully!", "success")
+    except Exception as e:
+        flash(f"Error adding question: {str(e)}", "error")
+    return redirect(url_for('main.quiz_editor', quiz_id=quiz_id))
+
+@bp.route('/instructor/edit_question/<question_id>', methods=['POST'])
+def edit_question(question_id):
+    if 'user_id' not in session or session['role'] != 'instructor': return redirect(url_for('main.role_select'))
+    try:
+        quiz_id = request.form.get('quiz_id')
+        q_type = request.form.get('question_type')
+        data = { "question_text": request.form.get('question_text') }
+
+        if q_type == 'MCQ':
+            data.update({
+                "option_a": request.form.get('option_a'), "option_b": request.form.get('option_b'),
+                "option_c": request.form.get('option_c'), "option_d": request.form.get('option_d'),
+                "correct_option": request.form.get('correct_option')
+            })
+        elif q_type == 'FILL_BLANK':
+            data.update({ "correct_option": request.form.get('correct_text') })
+        elif q_type == 'THEORY':
+            data.update({ "keywords": request.form.get('keywords') })
+
+        supabase.table("questions").update(data).eq("id", question_id).execute()
+        flash("Question updated successfully!", "success")
+        return redirect(url_for('main.quiz_editor', quiz_id=quiz_id))
+    except Exception as e:
+        flash(f"Error updating question: {str(e)}", "error")
+        return redirect(url_for('main.instructor_courses'))
+
+@bp.route('/instructor/delete_question/<question_id>')
+def delete_question(question_id):
+    if 'user_id' not in session or session['role'] != 'instructor': return redirect(url_for('main.role_select'))
+    try:
+        q_data = supabase.table("questions").select("quiz_id").eq("id", question_id).single().execute()
+        quiz_id = q_data.data['quiz_id']
+        supabase.table("questions").delete().eq("id", question_id).execute()
+        flash("Question deleted successfully.", "success")
+        return redirect(url_for('main.quiz_editor', quiz_id=quiz_id))
+    except Exception as e:
+        flash(f"Error deleting question: {str(e)}", "error")
+        return redirect(url_for('main.instructor_courses'))
+
+@bp.route('/instructor/edit_quiz/<quiz_id>', methods=['POST'])
+def edit_quiz(quiz_id):
+    if 'user_id' not in session or session['role'] != 'instructor': return redirect(url_for('main.role_select'))
+    try:
+        is_active = True if request.form.get('is_active') else False 
+        # UPDATE: Added max_attempts to update
+        supabase.table("quizzes").update({
+            "title": request.form.get('title'),
+            "duration_minutes": request.form.get('duration'),
+            "max_attempts": request.form.get('max_attempts', 1),
+            "is_active": is_active
+        }).eq("id", quiz_id).execute()
+        flash("Quiz settings updated!", "success")
+    except Exception as e:
+        flash(f"Error updating quiz: {str(e)}", "error")
+    return redirect(url_for('main.course_detail', course_id=request.form.get('course_id')))
+
+@bp.route('/instructor/delete_quiz/<quiz_id>')
+def delete_quiz(quiz_id):
+    if 'user_id' not in session or session['role'] != 'instructor': 
+        return redirect(url_for('main.role_select'))
+    
+    try:
+        # 1. Get course_id for redirect (only from a course this instructor owns)
+        quiz = supabase.table("quizzes").select("course_id, courses!inner(instructor_id)")\
+            .eq("id", quiz_id)\
+            .eq("courses.instructor_id", session['user_id'])\
+            .limit(1)\
+            .execute().data
+        if not quiz:
+            flash("Quiz not found.", "error")
+            return redirect(url_for('main.instructor_courses'))
+        course_id = quiz[0]['course_id']
+
+        # Questions, results, answers, attempts and XP log go with it, in one transaction
+        counts = deletion.delete_quiz(quiz_id, archive=request.args.get('archive') == '1')
+
+        if counts['archived']:
+            flash(f"Quiz deleted. {counts['archived']} result records were archived.", "success")
+        else:
+            flash("Quiz deleted successfully.", "success")
+        return redirect(url_for('main.course_detail', course_id=course_id))
+        
+    except Exception as e:
+        flash(f"Error deleting quiz: {str(e)}", "error")
+        return redirect(url_for('main.instructor_courses'))
+
+@bp.route('/instructor/delete_course/<course_id>')
+def delete_course(course_id):
+    if 'user_id' not in session or session['role'] != 'instructor': 
+        return redirect(url_for('main.role_select'))
+
+    try:
+        course = supabase.table("courses").select("id, title")\
+            .eq("id", course_id)\
+            .eq("instructor_id", session['user_id'])\
+            .limit(1)\
+            .execute().data
+        if not course:
+            flash("Course not found.", "error")
+            return redirect(url_for('main.instructor_courses'))
+
+        counts = deletion.delete_course(course_id, archive=request.args.get('archive') == '1')
+
+        message = f"Course '{course[0]['title']}' deleted with {counts.get('quizzes', 0)} quizzes."
+        if counts['archived']:
+            message += f" {counts['archived']} result records were archived."
+        flash(message, "success")
+    except Exception as e:
+        flash(f"Error deleting course: {str(e)}", "error")
+    return redirect(url_for('main.instructor_courses'))
+
+# ==========================================
+# TRACKING & REPORTING (UPDATED)
+# ==========================================
+
+# 1. STUDENT TRACKER LIST
+# --- INSTRUCTOR: STUDENT TRACKER ---
+
+# 1. SHOW COURSE TILES (The Entry Point)
+@bp.route('/instructor/students')
+def instructor_students():
+    if 'user_id' not in session or session['role'] != 'instructor': return redirect(url_for('main.role_select'))
+    
+    # Fetch courses taught by this instructor
+    courses = supabase.table("courses").select("*").eq("instructor_id", session['user_id']).execute().data
+    
+    return render_template('instructor_students.html', courses=courses)
+
+# 2. SHOW STUDENTS FOR A SPECIFIC COURSE (The Detail View)
+@bp.route('/instructor/students/<course_id>')
+def instructor_course_students(course_id):
+    if 'user_id' not in session or session['role'] != 'instructor': return redirect(url_for('main.role_select'))
+    
+    # Fetch Course Info
+    course = supabase.table("courses").select("id, title").eq("id", course_id).single().execute().data
+
+    # Enrolled students with name, email and school ID (cached per course)
+    students = roster.course_roster(course_id)
+        
+    return render_template('instructor_course_students.html', course=course, students=students)
+
+# BULK ROSTER IMPORT (CSV of emails or school student IDs)
+@bp.route('/instructor/students/<course_id>/import', methods=['POST'])
+def import_roster(course_id):
+    if 'user_id' not in session or session['role'] != 'instructor': return redirect(url_for('main.role_select'))
+
+    course = supabase.table("courses").select("id")\
+        .eq("id", course_id)\
+        .eq("instructor_id", session['user_id'])\
+        .limit(1)\
+        .execute().data
+    if not course:
+        flash("Course not found.", "error")
+        return redirect(url_for('main.instructor_students'))
+
+    roster_file = request.files.get('roster')
+    if not roster_file or not roster_file.filename:
+        flash("Please choose a CSV file to import.", "error")
+        return redirect(url_for('main.instructor_course_students', course_id=course_id))
+
+    try:
+        text = roster_file.read().decode('utf-8-sig')
+        report = enrollment.import_roster(course_id, text)
+        message = f"Roster imported: {report['enrolled']} enrolled, {report['skipped']} already enrolled, {report['unknown']} not found."
+        if report['unknown_identifiers']:
+            message += " Not found: " + ", ".join(report['unknown_identifiers'][:10])
+            if report['unknown'] > 10: message += ", ..."
+        flash(message, "success" if report['unknown'] == 0 else "warning")
+    except UnicodeDecodeError:
+        flash("The roster must be a UTF-8 CSV file.", "error")
+    except Exception as e:
+        flash(f"Error importing roster: {str(e)}", "error")
+    return redirect(url_for('main.instructor_course_students', course_id=course_id))
+
+# MISSING SUBMISSIONS (enrolled students yet to attempt each quiz)
+@bp.route('/instructor/students/<course_id>/missing')
+def missing_submissions(course_id):
+    if 'user_id' not in session or session['role'] != 'instructor': return redirect(url_for('main.role_select'))
+
+    course = supabase.table("courses").select("id, title").eq("id", course_id).single().execute().data
+    quizzes = supabase.table("quizzes").select("id, title").eq("course_id", course_id).order("created_at").execute().data
+
+    # Set arithmetic on the in-memory membership bitmaps
+    missing = membership.missing_submissions(course_id, [q['id'] for q in quizzes])
+    completed = membership.attempted_all(course_id, [q['id'] for q in quizzes])
+
+    names = {s.student_id: s.name for s in roster.course_roster(course_id)}
+
+    report = []
+    for q in quizzes:
+        report.append({
+            "title": q['title'],
+            "students": sorted(names.get(uid, "Unknown") for uid in missing[q['id']]),
+        })
+
+    return render_template('instructor_missing_submissions.html', course=course, report=report,
+                           enrolled=len(membership.get_index().enrolled(course_id)), completed=len(completed))
+
+# 2. GRADEBOOK TILES (Select Course)
+@bp.route('/instructor/gradebook')
+def instructor_gradebook_select():
+    if 'user_id' not in session or session['role'] != 'instructor': return redirect(url_for('main.role_select'))
+    
+    # Fetch courses taught by this instructor
+    courses = supabase.table("courses").select("*").eq("instructor_id", session['user_id']).execute().data
+    
+    return render_template('instructor_gradebook_select.html', courses=courses)
+
+# 3. CLASS LEADERBOARD (Ranked View)
+@bp.route('/instructor/gradebook/<course_id>')
+def instructor_course_analytics(course_id):
+    if 'user_id' not in session or session['role'] != 'instructor': return redirect(url_for('main.role_select'))
+
+    # Fetch Course Details
+    course = supabase.table("courses").select("*").eq("id", course_id).single().execute().data
+
+    # Per-student totals from the materialised gradebook
+    totals = gradebook.course_totals(course_id)
+    
+    # Students in this course, with school IDs
+    students = roster.course_roster(course_id)
+
+    # Calculate Ranking
+    leaderboard = []
+    for student in students:
+        student_totals = totals.get(student.student_id, {})
+        
+        total_score = student_totals.get('score_sum', 0)
+        count = student_totals.get('attempts', 0)
+        avg_score = round(total_score / count) if count > 0 else 0
+        
+        leaderboard.append({
+            "name": student.name,
+            "email": student.email,
+            "school_id": student.school_id,
+            "quizzes_taken": count,
+            "average": avg_score,
+            "total_points": total_score
+        })
+
+    # Sort by Average Score
+    leaderboard.sort(key=lambda x: x['average'], reverse=True)
+
+    # Weekly XP leaders among this course's students
+    xp_leaders = xp.weekly_leaderboard(course_id, limit=5)
+
+    return render_template('instructor_course_analytics.html', course=course, students=leaderboard, xp_leaders=xp_leaders)
+
+# 4. CSV EXPORT (Matrix Gradebook)
+@bp.route('/instructor/export_csv/<course_id>')
+def export_csv(course_id):
+    if 'user_id' not in session or session['role'] != 'instructor': return redirect(url_for('main.login'))
+    
+    target_ca = int(request.args.get('ca', grades.DEFAULT_TARGET_CA))
+
+    quizzes = supabase.table("quizzes").select("id, title").eq("course_id", course_id).order("created_at").execute().data
+    students = roster.course_roster(course_id)
+    
+    cells = gradebook.course_cells(course_id)
+
+    matrix = {}
+    for s in students:
+        matrix[s.student_id] = { 'name': s.name, 'id': s.school_id, 'scores': {} }
+
+    for c in cells:
+        if c['student_id'] in matrix:
+            matrix[c['student_id']]['scores'][c['quiz_id']] = c['latest_score']
+
+    si = StringIO()
+    cw = csv.writer(si)
+    
+    quiz_headers = [q['title'] for q in quizzes]
+    cw.writerow(['Student Name', 'ID'] + quiz_headers + ['Average %', f'Final CA (/{target_ca})'])
+
+    for uid, data in matrix.items():
+        row = [data['name'], data['id']]
+        total = 0
+        for q in quizzes:
+            s = data['scores'].get(q['id'], 0)
+            row.append(s)
+            total += s
+        
+        avg, final_ca = grades.ca_projection(total, len(quizzes), target_ca)
+        row.append(f"{avg}%")
+        row.append(final_ca)
+        cw.writerow(row)
+
+    output = make_response(si.getvalue())
+    output.headers["Content-Disposition"] = f"attachment; filename=grades_{course_id}.csv"
+    output.headers["Content-type"] = "text/csv"
+    return output
+
+# 5. FIXED REPORTS (General View)
+@bp.route('/instructor/reports')
+def instructor_reports():
+    if 'user_id' not in session or session['role'] != 'instructor': 
+        return redirect(url_for('main.role_select'))
+    
+    user_id = session['user_id']
+    
+    try:
+        # SIMPLER QUERY: Get all results for courses taught by this instructor
+        # First, get all course IDs taught by this instructor
+        courses = supabase.table("courses").select("id").eq("instructor_id", user_id).execute()
+        course_ids = [course['id'] for course in courses.data]
+        
+        # If no courses, return empty
+        if not course_ids:
+            return render_template('instructor_reports.html', reports=[])
+        
+        # Get all quizzes in these courses
+        quizzes = fetching.fetch_in(lambda: supabase.table("quizzes").select("id, title, course_id"), "course_id", course_ids)
+        quiz_ids = [quiz['id'] for quiz in quizzes]
+        
+        if not quiz_ids:
+            return render_template('instructor_reports.html', reports=[])
+        
+        # Get all exam results for these quizzes (chunked: one URL can't hold every quiz id)
+        results = fetching.iter_in(lambda: supabase.table("exam_results").select("*, users(full_name), quizzes(title)"),
+                                   "quiz_id", quiz_ids, order_by="submitted_at", desc=True)
+        
+        # Format the data for the template
+        reports = []
+        for r in results:
+            reports.append({
+                'student_name': r['users']['full_name'] if r.get('users') else 'Unknown',
+                'quiz_title': r['quizzes']['title'] if r.get('quizzes') else 'Unknown Quiz',
+                'date': r['submitted_at'][:10] if r.get('submitted_at') else '',
+                'score': r.get('score', 0),
+                'violation_count': r.get('violation_count', 0),
+                'passed': r.get('score', 0) >= 50
+            })
+        
+        return render_template('instructor_reports.html', reports=reports)
+        
+    except Exception as e:
+        # For debugging, you can return the error
+        return f"Error loading reports: {str(e)}"
+
+@bp.route('/instructor/quiz_results/<quiz_id>')
+def instructor_quiz_results(quiz_id):
+    if 'user_id' not in session or session['role'] != 'instructor': return redirect(url_for('main.role_select'))
+    
+    quiz = supabase.table("quizzes").select("title, course_id, courses(title)").eq("id", quiz_id).single().execute()
+    cells = gradebook.quiz_cells(quiz_id)
+    results = supabase.table("exam_results").select("id, student_id, score, feedback, submitted_at").eq("quiz_id", quiz_id).order("submitted_at", desc=True).execute().data
+    
+    grouped = {}
+    for c in cells:
+        grouped[c['student_id']] = {
+            'student_id': c['student_id'], 'name': c['users']['full_name'], 'email': c['users']['email'],
+            'attempts': [], 'best_score': c['best_score'], 'latest_submission': c['latest_submitted_at']
+        }
+    for r in results:
+        if r['student_id'] in grouped:
+            grouped[r['student_id']]['attempts'].append(r)
+            
+    return render_template('instructor_quiz_results.html', quiz=quiz.data, students=grouped)
+
+@bp.route('/instructor/grade_attempt/<result_id>', methods=['GET', 'POST'])
+def grade_attempt(result_id):
+    if 'user_id' not in session or session['role'] != 'instructor': return redirect(url_for('main.role_select'))
+
+    if request.method == 'POST':
+        updated = supabase.table("exam_results").update({
+            "score": request.form.get('manual_score'),
+            "feedback": request.form.get('feedback')
+        }).eq("id", result_id).execute().data
+        if updated:
+            gradebook.record_result(updated[0]['student_id'], updated[0]['quiz_id'])
+        flash("Grade updated successfully!", "success")
+        return redirect(url_for('main.grade_attempt', result_id=result_id))
+
+    data = supabase.table("exam_results").select("*, quizzes(id, title), users(full_name)").eq("id", result_id).single().execute()
+    result = data.data
+    q_response = supabase.table("questions").select("*").eq("quiz_id", result['quizzes']['id']).execute()
+    
+    review_data = []
+    saved_answers = result.get('answers', {}) or {}
+    
+    for q in q_response.data:
+        review_data.append({
+            "question": q.get('question_text'),
+            "user_answer": saved_answers.get(str(q['id']), ""),
+            "correct_answer": q.get('correct_option'),
+            "type": q['question_type']
+        })
+        
+    return render_template('instructor_grade_attempt.html', result=result, review=review_data)
+
+# ==========================================
+# STUDENT MODULES
+# ==========================================
+
+@bp.route('/student/dashboard')
+def student_dashboard():
+    if 'user_id' not in session or session['role'] != 'student': 
+        return redirect(url_for('main.role_select'))
+    
+    user_id = session['user_id']
+    search_query = request.args.get('q', '')
+
+    # 1. Get user stats with level and badge
+    user_data = supabase.table("users").select("points, current_badge, level").eq("id", user_id).single().execute()
+    stats = user_data.data if user_data.data else {
+        "points": 0, 
+        "current_badge": "Novice", 
+        "level": 1
+    }
+
+    # 2. Calculate rank (students with more XP)
+    rank_query = supabase.table("users")\
+        .select("id", count="exact")\
+        .gt("points", stats['points'])\
+        .eq("role", "student")\
+        .execute()
+    
+    rank = rank_query.count + 1 if rank_query.count else 1
+    total_students = supabase.table("users").select("id", count="exact").eq("role", "student").execute().count
+    rank_progress = int(((total_students - rank + 1) / total_students) * 100) if total_students > 0 else 0
+    students_ahead = rank - 1
+
+    # 3. Get level progression
+    current_level = stats.get('level', 1)
+    next_level = current_level + 1
+    
+    current_level_data = supabase.table("levels")\
+        .select("xp_required")\
+        .eq("level", current_level)\
+        .single().execute().data
+    
+    next_level_data = supabase.table("levels")\
+        .select("xp_required")\
+        .eq("level", next_level)\
+        .single().execute().data if next_level <= 10 else None
+    
+    current_xp_required = current_level_data.get('xp_required', 0)
+    next_xp_required = next_level_data.get('xp_required', 0) if next_level_data else 0
+    
+    xp_in_current_level = stats['points'] - current_xp_required
+    xp_needed_for_next = next_xp_required - current_xp_required if next_xp_required > 0 else 0
+    level_progress = int((xp_in_current_level / xp_needed_for_next) * 100) if xp_needed_for_next > 0 else 100
+    xp_to_next_level = xp_needed_for_next - xp_in_current_level if xp_needed_for_next > 0 else 0
+
+    # 4. Get XP progress visualization
+    all_levels = supabase.table("levels").select("*").order("level", desc=False).execute().data
+    
+    # 5. XP earned this week / month, daily streak and recent earnings, in one read
+    xp_totals = xp.xp_summary(user_id)
+    
+    # 6. Total XP progress (toward max level)
+    max_level_xp = all_levels[-1]['xp_required'] if all_levels else 4500
+    total_xp_progress = int((stats['points'] / max_level_xp) * 100)
+
+    # 7. Get enrolled courses
+    my_courses_resp = supabase.table("enrollments")\
+        .select("course_id, courses(title, category, description, id)")\
+        .eq("student_id", user_id)\
+        .execute()
+    my_courses = my_courses_resp.data
+    enrolled_ids = [item['course_id'] for item in my_courses]
+
+    # 8. Get available courses
+    query = supabase.table("courses").select("*")
+    if search_query: 
+        query = query.ilike("title", f"%{search_query}%")
+    if enrolled_ids: 
+        query = query.not_.in_("id", enrolled_ids)
+    all_courses = query.execute().data
+    
+    return render_template('student_dashboard.html', 
+                         user=session, 
+                         stats=stats,
+                         rank=rank,
+                         rank_progress=rank_progress,
+                         students_ahead=students_ahead,
+                         level_progress=level_progress,
+                         xp_to_next_level=xp_to_next_level,
+                         levels=all_levels,
+                         recent_xp=xp_totals['recent'],
+                         xp_this_week=xp_totals['week'],
+                         xp_this_month=xp_totals['month'],
+                         xp_streak=xp_totals['streak'],
+                         total_xp_progress=total_xp_progress,
+                         my_courses=my_courses, 
+                         all_courses=all_courses, 
+                         search_query=search_query)
+
+@bp.route('/student/join_course/<course_id>')
+def join_course(course_id):
+    if 'user_id' not in session: return redirect(url_for('main.role_select'))
+    try:
+        supabase.table("enrollments").insert({ "student_id": session['user_id'], "course_id": course_id }).execute()
+        membership.enroll(course_id, [session['user_id']])
+        roster.invalidate(course_id)
+        flash("Successfully joined the class!", "success")
+    except:
+        flash("You are already enrolled.", "info")
+    return redirect(url_for('main.student_dashboard'))
+
+@bp.route('/student/drop_course/<course_id>')
+def drop_course(course_id):
+    if 'user_id' not in session: return redirect(url_for('main.role_select'))
+    try:
+        supabase.table("enrollments").delete().eq("student_id", session['user_id']).eq("course_id", course_id).execute()
+        membership.unenroll(course_id, session['user_id'])
+        roster.invalidate(course_id)
+        flash("You have dropped the class.", "info")
+    except Exception as e:
+        flash(f"Error dropping course: {str(e)}", "error")
+    return redirect(url_for('main.student_dashboard'))
+
+@bp.route('/student/grades')
+def student_grades():
+    if 'user_id' not in session: return redirect(url_for('main.role_select'))
+    target_ca = request.args.get('ca', grades.DEFAULT_TARGET_CA, type=int)
+    summaries = grades.course_summaries(session['user_id'], target_ca)
+    return render_template('student_grades.html', courses=summaries, stats=grades.overall_stats(summaries), target_ca=target_ca)
+
+@bp.route('/student/grades/<course_id>/attempts')
+def student_grade_attempts(course_id):
+    if 'user_id' not in session: return redirect(url_for('main.role_select'))
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    page, has_more = grades.course_attempts(session['user_id'], course_id, offset=offset)
+    return render_template('student_grade_attempts.html', course_id=course_id, attempts=page,
+                           has_more=has_more, next_offset=offset + len(page))
+
+@bp.route('/student/course/<course_id>')
+def student_course_detail(course_id):
+    if 'user_id' not in session or session['role'] != 'student': return redirect(url_for('main.role_select'))
+    course = supabase.table("courses").select("*").eq("id", course_id).single().execute()
+    quizzes = supabase.table("quizzes").select("*").eq("course_id", course_id).eq("is_active", True).execute()
+    return render_template('student_course_detail.html', user=session, course=course.data, quizzes=quizzes.data)
+
+@bp.route('/student/quiz_start/<quiz_id>')
+def quiz_start(quiz_id):
+    if 'user_id' not in session: return redirect(url_for('main.role_select'))
+    
+    quiz = supabase.table("quizzes").select("*").eq("id", quiz_id).single().execute().data
+    
+    # Check previous attempts
+    ledger = attempts.get_ledger(session['user_id'], quiz_id)
+    if attempts.is_expired(ledger, quiz):
+        # Abandoned past its deadline: submit what was saved, then it counts as used
+        submissions.auto_submit(session['user_id'], quiz_id, ledger['in_progress_id'])
+        ledger = attempts.get_ledger(session['user_id'], quiz_id)
+    can_take, message = attempts.check_eligibility(ledger, quiz)
+    attempts_used = ledger['attempts_used']
+
+    return render_template('student_quiz_start.html', quiz=quiz, can_take=can_take, message=message, attempts_used=attempts_used)
+
+
+@bp.route('/student/take_quiz/<quiz_id>')
+def student_take_quiz(quiz_id):
+    if 'user_id' not in session: return redirect(url_for('main.role_select'))
+    user_id = session['user_id']
+
+    # 1. Fetch Quiz
+    try:
+        quiz = supabase.table("quizzes").select("*").eq("id", quiz_id).single().execute().data
+    except:
+        return redirect(url_for('main.student_dashboard'))
+
+    # 2. Open (or resume) an attempt - also enforces the attempt limit
+    try:
+        ledger = attempts.start_attempt(user_id, quiz)
+        if attempts.is_expired(ledger, quiz):
+            submissions.auto_submit(user_id, quiz_id, ledger['in_progress_id'])
+            ledger = attempts.start_attempt(user_id, quiz)
+    except attempts.AttemptNotAllowed as e:
+        flash(str(e), "error")
+        return redirect(url_for('main.student_dashboard'))
+    except Exception as e:
+        flash(f"Error starting quiz: {str(e)}", "error")
+        return redirect(url_for('main.student_dashboard'))
+
+    # 3. Fetch Questions
+    raw_questions = supabase.table("questions").select("*").eq("quiz_id", quiz_id).order("id").execute().data
+
+    # 4. Format for the page - no answer keys
+    formatted_questions = grading.student_questions(raw_questions)
+
+    return render_template('take_quiz.html', quiz=quiz, questions=formatted_questions,
+                           attempt_id=ledger['in_progress_id'], time_left=attempts.seconds_left(ledger, quiz))
+
+@bp.route('/api/save_progress', methods=['POST'])
+def save_progress():
+    if 'user_id' not in session: return jsonify({"status": "error"}), 401
+    data = request.json
+    try:
+        for q_id, val in data.get('answers', {}).items():
+            supabase.table("student_answers").upsert({
+                "student_id": session['user_id'], "quiz_id": data.get('quiz_id'),
+                "question_id": q_id, "selected_answer": val, "updated_at": "now()"
+            }, on_conflict="student_id, question_id").execute()
+        return jsonify({"status": "success"}), 200
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@bp.route('/student/submit_quiz/<quiz_id>', methods=['POST'])
+def submit_quiz(quiz_id):
+    if 'user_id' not in session: 
+        return redirect(url_for('main.role_select'))
+    
+    user_id = session['user_id']
+
+    # 1. Get violation count from form
+    violation_count = int(request.form.get('violation_count', 0))
+    submission_id = request.form.get('attempt_id')
+    buffered = current_app.config['SUBMISSION_MODE'] == 'buffered'
+
+    # A resent form for an already-queued submission just shows its result
+    if buffered and submission_id and submission_queue.get_queue().get(submission_id):
+        return redirect(url_for('main.student_pending_result', submission_id=submission_id))
+    
+    # 2. Get Answers from Form
+    raw_answers = request.form.get('final_answers', '{}')
+    try:
+        answers = json.loads(raw_answers)
+    except:
+        answers = {}
+
+    try:
+        # 3. Grade the Quiz
+        data = submissions.build_result(user_id, quiz_id, submission_id, answers, violation_count)
+
+        if buffered:
+            # Saved by the background drainer in batches; XP is awarded then.
+            # Close the attempt first - rejects reposts and submissions that never started
+            ledger = attempts.get_ledger(user_id, quiz_id)
+            if not attempts.finish_attempt(user_id, quiz_id, submission_id, violation_count):
+                flash("This attempt has already been submitted.", "error")
+                return redirect(url_for('main.student_dashboard'))
+            data["submitted_at"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+            try:
+                submission_queue.get_queue().enqueue(data)
+            except Exception:
+                # Not queued: give the attempt back so the student can resubmit
+                attempts.reopen_attempt(user_id, quiz_id, submission_id, ledger['started_at'])
+                raise
+            return redirect(url_for('main.student_pending_result', submission_id=submission_id))
+
+        # 4. Close the attempt and save the result together - rejects reposts and submissions that never started
+        new_result_id = submissions.submit_attempt(data)
+        if not new_result_id:
+            flash("This attempt has already been submitted.", "error")
+            return redirect(url_for('main.student_dashboard'))
+        
+        # 5. UPDATE GRADEBOOK & AWARD XP BASED ON PERFORMANCE (the result is saved either way)
+        try:
+            submissions.after_save(new_result_id, data)
+        except Exception as e:
+            print(f"Error following up result {new_result_id}: {str(e)}")
+        
+        return redirect(url_for('main.student_quiz_result', result_id=new_result_id))
+        
+    except Exception as e:
+        flash(f"Error submitting quiz: {str(e)}", "error")
+        return redirect(url_for('main.student_dashboard'))
+
+
+@bp.route('/student/quiz_result/pending/<submission_id>')
+def student_pending_result(submission_id):
+    if 'user_id' not in session: 
+        return redirect(url_for('main.role_select'))
+
+    queue = submission_queue.get_queue()
+    entry = queue.get(submission_id) if queue else None
+    if not entry or entry['student_id'] != session['user_id']:
+        flash("Submission not found.", "error")
+        return redirect(url_for('main.student_dashboard'))
+
+    if entry['status'] == 'dead':
+        flash("Your submission could not be saved. Please contact your instructor.", "error")
+        return redirect(url_for('main.student_dashboard'))
+
+    # Already flushed to the database
+    if entry['result_id']:
+        return redirect(url_for('main.student_quiz_result', result_id=entry['result_id']))
+
+    try:
+        result = json.loads(entry['payload'])
+        result['quizzes'] = supabase.table('quizzes').select('title').eq('id', result['quiz_id']).single().execute().data
+        questions = supabase.table('questions').select('*').eq('quiz_id', result['quiz_id']).execute().data
+        report = grading.build_report(questions, json.loads(result['answers']))
+        return render_template('quiz_result.html', result=result, report=report)
+    except Exception as e:
+        flash(f"Error loading results: {str(e)}", "error")
+        return redirect(url_for('main.student_dashboard'))
+
+@bp.route('/student/quiz_result/<result_id>')
+def student_quiz_result(result_id):
+    if 'user_id' not in session: 
+        return redirect(url_for('main.role_select'))
+    
+    try:
+        # Fetch result with quiz and course info
+        result_data = supabase.table('exam_results')\
+            .select('*, quizzes!inner(title, course_id, courses!inner(title))')\
+            .eq('id', result_id)\
+            .single()\
+            .execute()
+        result = result_data.data
+        
+        # Parse answers JSON
+        answers_json = result.get('answers', '{}')
+        if isinstance(answers_json, str):
+            try:
+                answers = json.loads(answers_json)
+            except:
+                answers = {}
+        else:
+            answers = answers_json
+        
+        # Fetch all questions for this quiz
+        questions = supabase.table('questions')\
+            .select('*')\
+            .eq('quiz_id', result['quiz_id'])\
+            .execute()\
+            .data
+        
+        report = grading.build_report(questions, answers)
+        
+        return render_template('quiz_result.html', result=result, report=report)
+        
+    except Exception as e:
+        flash(f"Error loading results: {str(e)}", "error")
+        return redirect(url_for('main.student_dashboard'))